@@ -1,32 +1,162 @@
+import argparse  # used for parsing the command line arguments
+import collections  # used for the layout of the game
 import os  # used for file and directory operations
-import random  # used for creating tetrominoes with random types/shapes
 
 import stddraw  # the stddraw module is used as a basic graphics library
 from color import Color  # used for coloring the game menu
-from game_grid import GameGrid  # class for modeling the game grid
-from picture import Picture  # used representing images to display
+import picture  # used for loading the images to display
+from game_grid import GameGrid, PAUSE_IMAGE, information_font_size  # class for modeling the game grid
+from scene_runner import SceneRunner  # used for running the menus and the game
 from tetromino import Tetromino  # class for modeling the tetrominoes
+from tile import Tile  # used for the font of the tile numbers
+
+# get the directory in which this python code file is placed
+current_dir = os.path.dirname(os.path.realpath(__file__))
+# paths of the image files used in the menus
+MENU_IMAGE = current_dir + "/menu_image_1.png"
+GAME_OVER_IMAGE = current_dir + "/game_over_1.png"
+# directory of the profiles written when the profiling hotkey is used
+PROFILE_DIR = current_dir + "/profiles"
+
+# draw the game grid on a separate render thread (set from the command line)
+use_render_thread = False
+# format and length (in seconds) of the profiles started with the F9 key
+profile_format = "collapsed"
+profile_seconds = 10
+# report the allocations made in each frame when the game ends, and keep the
+# full garbage collections out of the frames (set from the command line)
+track_allocations = False
+defer_collections = False
+# directory the frames shown are recorded to (None for not recording) and
+# the format they are written in, "png" or "raw" (set from the command line)
+record_dir = None
+record_format = "png"
+# the way the game grid is drawn (one of GameGrid.RENDER_MODES), None selects
+# "raster" for game grids with at least RASTER_MIN_CELLS cells
+render_mode = None
+RASTER_MIN_CELLS = 2000
+
+# dimensions of the game grid and of the game grid together with the
+# information grid on its right, and the size of a grid cell on the canvas (in
+# pixels), shared by all the scenes
+Layout = collections.namedtuple("Layout", ["grid_h", "grid_w", "full_grid_h", "full_grid_w",
+                                           "cell_size"])
+# (grid height, grid width, cell size) of the game for each preset, "stress"
+# is used for testing the game on a large game grid
+PRESETS = {
+    "default": (20, 12, 40),
+    "stress": (200, 100, 4),
+}
 
 
 # MAIN FUNCTION OF THE PROGRAM
 # -------------------------------------------------------------------------------
-# Main function where this program starts execution
-def start():
-    # set the dimensions of the game grid
-    grid_h, grid_w = 20, 12
+# Main function where this program starts execution, the game is played on a
+# game grid with the given dimensions and cell size (in pixels)
+def start(grid_h=20, grid_w=12, cell_size=40):
+    layout = create_layout(grid_h, grid_w, cell_size)
+    # the numbers on the tiles are scaled with the cells
+    Tile.set_cell_size(cell_size)
+    # start reading the images while the window is being created
+    picture.preload([MENU_IMAGE, GAME_OVER_IMAGE, PAUSE_IMAGE])
+    # start creating the fonts (family, size, bold) used by the menus and the
+    # game grid while the menu is shown
+    stddraw.preloadFonts([("Arial", menu_font_size(layout, 40), False),
+                          ("Arial", menu_font_size(layout, 30), False),
+                          (Tile.font_family, Tile.font_size, True),
+                          ("Arial", information_font_size(grid_w, cell_size), True)])
+    # the canvas is created once and used by all the scenes
+    setup_canvas(layout)
+    runner = SceneRunner()
+    tracker, scheduler = None, None
+    # the optional tools are imported only when they are used, like the recorder
+    if track_allocations or defer_collections:
+        import allocations
+    if track_allocations:
+        tracker = allocations.AllocationTracker()
+        tracker.start()
+    if defer_collections:
+        # the objects created at startup are not scanned by the collections
+        # anymore, and the full collections are made while the game waits
+        allocations.freeze_startup_objects()
+        scheduler = allocations.CollectionScheduler()
+        scheduler.start()
+        runner.idle_listeners.append(scheduler.idle)
+    recording = None
+    if record_dir is not None:
+        # the recorder (and pygame.surfarray) is imported only when it is used
+        from recorder import Recorder
+        recording = Recorder(record_dir, record_format)
+        recording.start()
+    # the menus and the game are run as coroutines on a single event loop,
+    # starting from the main menu
+    try:
+        runner.run(display_game_menu, layout)
+    finally:
+        if tracker is not None:
+            tracker.stop()
+            tracker.report()
+        if scheduler is not None:
+            scheduler.stop()
+        if recording is not None:
+            recording.stop()
+            print("%d frames recorded to %s, %d dropped" % (
+                recording.frame_count, record_dir, recording.dropped_count))
+
+
+# Function for computing the layout of the game for a game grid with the given
+# dimensions and cell size
+def create_layout(grid_h=20, grid_w=12, cell_size=40):
     # right information grid
     information_grid_h, information_grid_w = grid_h, grid_w / 3
     # sum of game and information grid
     full_grid_h, full_grid_w = grid_h, grid_w + information_grid_w
+    return Layout(grid_h, grid_w, full_grid_h, full_grid_w, cell_size)
+
+
+# layout the menus are drawn for: the menus are drawn in the coordinate system
+# of this layout whatever the size of the game grid is (see use_scale)
+MENU_LAYOUT = create_layout()
+
+
+# Function for creating the drawing canvas for the given layout
+def setup_canvas(layout):
     # set the size of the drawing canvas
-    canvas_h, canvas_w = 40 * full_grid_h, 40 * full_grid_w
+    canvas_h = round(layout.cell_size * layout.full_grid_h)
+    canvas_w = round(layout.cell_size * layout.full_grid_w)
     stddraw.setCanvasSize(canvas_w, canvas_h)
     # set the scale of the coordinate system
-    stddraw.setXscale(-0.5, full_grid_w - 0.5)
-    stddraw.setYscale(-0.5, full_grid_h - 0.5)
+    use_scale(layout)
+
+
+# Function for setting the scale of the coordinate system of the canvas to the
+# cells of the given layout
+def use_scale(layout):
+    stddraw.setXscale(-0.5, layout.full_grid_w - 0.5)
+    stddraw.setYscale(-0.5, layout.full_grid_h - 0.5)
+
 
+# Function for getting the font size that fits the canvas of the given layout
+# as the given size fits the canvas of the menu layout
+def menu_font_size(layout, size):
+    scale = min(layout.cell_size * layout.full_grid_w / (MENU_LAYOUT.cell_size * MENU_LAYOUT.full_grid_w),
+                layout.cell_size * layout.full_grid_h / (MENU_LAYOUT.cell_size * MENU_LAYOUT.full_grid_h))
+    return max(1, round(size * scale))
+
+
+# Scene of the game played with the given speed, it returns the game over menu
+# as the next scene when the game ends
+async def play(runner, layout, speed):
+    grid_h, grid_w = layout.grid_h, layout.grid_w
+    # the game grid is drawn in its own coordinate system
+    use_scale(layout)
     # create the game grid
-    grid = GameGrid(grid_h, grid_w, full_grid_h, full_grid_w)
+    grid = GameGrid(grid_h, grid_w, layout.full_grid_h, layout.full_grid_w, layout.cell_size)
+    # large game grids are drawn by writing the colors of the cells directly
+    if render_mode is not None:
+        grid.render_mode = render_mode
+    elif grid_h * grid_w >= RASTER_MIN_CELLS:
+        grid.render_mode = "raster"
     # create the first tetromino to enter the game grid
     # by using the create_tetromino function defined below
     current_tetromino = create_tetromino(grid_h, grid_w)
@@ -37,9 +167,21 @@ def start():
     next_tetromino = create_tetromino(grid_h, grid_w)
     grid.next_tetromino = next_tetromino
 
-    # display a simple menu before opening the game and determine the game speed
-    speed = display_game_menu(full_grid_h, full_grid_w)
+    # the game speed is selected in the difficulty menu
     grid.speed = speed
+    # the frames of the merges, clears and drops are recorded by the game grid
+    # and played by play_animation, so that the other tasks run between them
+    grid.animation = []
+    # draw the game grid on a separate thread if requested
+    if use_render_thread:
+        from renderer import RenderThread
+        grid.renderer = RenderThread(grid.render)
+        grid.renderer.start()
+    # profiling sessions are started and stopped with the F9 key, the profiles
+    # are tagged with the grid size and the speed of the game (the profiler is
+    # created when the key is typed for the first time)
+    profiler = None
+    profile_tag = "%dx%d_speed%d" % (grid_h, grid_w, speed)
     # clear the buttons typed at game menu
     stddraw.clearKeysTyped()
     restart = False
@@ -76,7 +218,16 @@ def start():
                 # game ends
                 # the game restarts
                 restart = True
+
+            elif key_typed == "f9":  # pressing F9 starts/stops profiling
+                if profiler is None:
+                    from profiler import Profiler
+                    profiler = Profiler(PROFILE_DIR, profile_format, profile_seconds)
+                report_profile(profiler.toggle(profile_tag))
             stddraw.clearKeysTyped()
+        # stop the profiling session when its time is up
+        if profiler is not None:
+            report_profile(profiler.poll())
 
         # do if the game is not paused
         if not grid.pause:
@@ -84,8 +235,7 @@ def start():
             success = current_tetromino.move("down", grid)
 
             if restart:
-                # show game over menu
-                game_over_menu(full_grid_h, full_grid_w, str(grid.score))
+                # game ends
                 break
             # place the tetromino on the game grid when it cannot go down anymore
             if not success:
@@ -93,16 +243,15 @@ def start():
                 tiles_to_place = current_tetromino.tile_matrix
                 # update the game grid by adding the tiles of the tetromino
                 game_over = grid.update_grid(tiles_to_place)
-                # do the merge
-                grid.merge()
-                # clear the full lines
-                grid.clearLines()
-                # remove the gaps
-                grid.remove_gaps()
+                # merge the tiles, clear the full lines and remove the gaps
+                # until the game grid does not change, then show the steps
+                grid.resolve()
+                await play_animation(runner, grid)
                 # end the main game loop if the game is over
                 if game_over:
-                    game_over_menu(full_grid_h, full_grid_w, str(grid.score))
                     break
+                # the placed tetromino is used again by create_tetromino
+                current_tetromino.release()
                 # create the next tetromino to enter the game grid
                 # by using the create_tetromino function defined below
                 # set the position of the next tetromino
@@ -114,39 +263,67 @@ def start():
                 next_tetromino = create_tetromino(grid_h, grid_w)
                 grid.next_tetromino = next_tetromino
 
-        # display the game grid and as well the current tetromino
-        grid.display()
+        # display the game grid and as well the current tetromino, then wait
+        # for the next step of the game
+        grid.present_frame()
+        if grid.pause:
+            # nothing changes in a paused game until the user types a key
+            await runner.wait_for_event()
+        else:
+            await runner.wait(grid.speed)
 
+    # the menus are drawn by this thread
+    stop_renderer(grid)
+    if profiler is not None and profiler.active():
+        report_profile(profiler.stop())
     print("Game over")
+    # show the game over menu
+    return game_over_menu, layout, str(grid.score)
+
+
+# Coroutine for showing the frames of the animation recorded by the given game
+# grid, waiting for the speed of the game after each frame
+async def play_animation(runner, grid):
+    frames, grid.animation = grid.animation, []
+    for snapshot in frames:
+        grid.present_frame(snapshot)
+        await runner.wait(grid.speed)
 
 
-# Function for creating random shaped tetrominoes to enter the game grid
+# Function for stopping the render thread of the game grid (if any) so that
+# the canvas can be drawn by the calling thread again
+def stop_renderer(grid):
+    if grid.renderer is not None:
+        grid.renderer.stop()
+        grid.renderer = None
+
+
+# Function for telling the player where a profile has been written (if any)
+def report_profile(path):
+    if path is not None:
+        print("Profile written to " + path)
+
+
+# Function for creating random shaped tetrominoes to enter the game grid (or
+# taking them from the pool)
 def create_tetromino(grid_height, grid_width):
-    # type (shape) of the tetromino is determined randomly
-    tetromino_types = ['I', 'O', 'Z', 'L', 'J', 'S', 'T']
-    random_index = random.randint(0, len(tetromino_types) - 1)
-    random_type = tetromino_types[random_index]
-    # create and return the tetromino
-    tetromino = Tetromino(random_type, grid_height, grid_width)
-    return tetromino
+    return Tetromino.random(grid_height, grid_width)
 
 
-# Function for displaying a simple menu before starting the game
-def display_game_menu(full_grid_height, full_grid_width):
+# Scene for displaying a simple menu before starting the game
+async def display_game_menu(runner, layout):
+    use_scale(MENU_LAYOUT)
+    full_grid_height, full_grid_width = MENU_LAYOUT.full_grid_h, MENU_LAYOUT.full_grid_w
     # colors used for the menu
     background_color = Color(160, 160, 160)
     button_color = Color(255, 200, 25)
     text_color = Color(64, 64, 64)
     # clear the background canvas to background_color
     stddraw.clear(background_color)
-    # get the directory in which this python code file is placed
-    current_dir = os.path.dirname(os.path.realpath(__file__))
-    # path of the image file
-    img_file = current_dir + "/menu_image_1.png"
     # center coordinates to display the image
     img_center_x, img_center_y = (full_grid_width - 1) / 2, full_grid_height - 7
-    # image is represented using the Picture class
-    image_to_display = Picture(img_file)
+    # the image is read from the disk only once
+    image_to_display = picture.load(MENU_IMAGE)
     # display the image
     stddraw.picture(image_to_display, img_center_x, img_center_y)
     # dimensions of the start game button
@@ -161,7 +338,7 @@ def display_game_menu(full_grid_height, full_grid_width):
     stddraw.filledRectangle(ht_x, ht_y, button_w, button_h)
     # display the text on the start game button
     stddraw.setFontFamily("Arial")
-    stddraw.setFontSize(40)
+    stddraw.setFontSize(menu_font_size(layout, 40))
     stddraw.setPenColor(text_color)
     text_to_display = "Start"
     stddraw.text(img_center_x, 5, text_to_display)
@@ -169,8 +346,8 @@ def display_game_menu(full_grid_height, full_grid_width):
     stddraw.text(img_center_x, 2, text_to_display)
     # menu interaction loop
     while True:
-        # display the menu and wait for a short time (50 ms)
-        stddraw.show(50)
+        # display the menu and wait until the user does something
+        await runner.show_on_event()
         # check if the mouse has been left-clicked
         if stddraw.mousePressed():
             # get the x and y coordinates of the location at which the mouse has
@@ -178,14 +355,16 @@ def display_game_menu(full_grid_height, full_grid_width):
             mouse_x, mouse_y = stddraw.mouseX(), stddraw.mouseY()
             if button_blc_x <= mouse_x <= button_blc_x + button_w:
                 if button_blc_y <= mouse_y <= button_blc_y + button_h:
-                    return difficultyMenu(full_grid_width)
+                    return difficultyMenu, layout
             if ht_x <= mouse_x <= ht_x + button_w:
                 if ht_y <= mouse_y <= ht_y + button_h:
-                    howToMenu(full_grid_width)
+                    return howToMenu, layout
 
 
-# method for displaying how to play menu
-def howToMenu(full_grid_width):
+# Scene for displaying how to play menu
+async def howToMenu(runner, layout):
+    use_scale(MENU_LAYOUT)
+    full_grid_width = MENU_LAYOUT.full_grid_w
     background_color = Color(160, 160, 160)
     button_color = Color(255, 200, 25)
     text_color = Color(64, 64, 64)
@@ -199,7 +378,7 @@ def howToMenu(full_grid_width):
     stddraw.setPenColor(Color(64, 64, 64))
     stddraw.filledRectangle(1.5, 3, 12, 12)
     stddraw.setFontFamily("Arial")
-    stddraw.setFontSize(40)
+    stddraw.setFontSize(menu_font_size(layout, 40))
     stddraw.setPenColor(text_color)
     text_to_display = "Main Menu"
     stddraw.text((full_grid_width - 1) / 2, 17, text_to_display)
@@ -215,8 +394,8 @@ def howToMenu(full_grid_width):
     text_to_display = "Restart Game : R key"
     stddraw.text((full_grid_width - 1) / 2, 5, text_to_display)
     while True:
-        # display the menu and wait for a short time (50 ms)
-        stddraw.show(50)
+        # display the menu and wait until the user does something
+        await runner.show_on_event()
         # check if the mouse has been left-clicked
         if stddraw.mousePressed():
             # get the x and y coordinates of the location at which the mouse has
@@ -224,11 +403,13 @@ def howToMenu(full_grid_width):
             mouse_x, mouse_y = stddraw.mouseX(), stddraw.mouseY()
             if bt_x <= mouse_x <= bt_x + button_w:
                 if bt_y <= mouse_y <= bt_y + button_h:
-                    start()
-                    break
+                    return display_game_menu, layout
 
 
-def difficultyMenu(full_grid_width):
+# Scene for selecting the difficulty (speed) of the game
+async def difficultyMenu(runner, layout):
+    use_scale(MENU_LAYOUT)
+    full_grid_width = MENU_LAYOUT.full_grid_w
     # colors used for the menu
     background_color = Color(160, 160, 160)
     button_color = Color(255, 200, 25)
@@ -250,7 +431,7 @@ def difficultyMenu(full_grid_width):
     stddraw.filledRectangle(menu_x, menu_y, menu_w, menu_h)
     # display the texts on buttons
     stddraw.setFontFamily("Arial")
-    stddraw.setFontSize(40)
+    stddraw.setFontSize(menu_font_size(layout, 40))
     stddraw.setPenColor(text_color)
     text_to_display = "Select Difficulty"
     stddraw.text((full_grid_width - 1) / 2, 18, text_to_display)
@@ -260,13 +441,13 @@ def difficultyMenu(full_grid_width):
     stddraw.text((full_grid_width - 1) / 2, medium_y + 1, text_to_display)
     text_to_display = "Hard"
     stddraw.text((full_grid_width - 1) / 2, hard_y + 1, text_to_display)
-    stddraw.setFontSize(30)
+    stddraw.setFontSize(menu_font_size(layout, 30))
     text_to_display = "Main Menu"
     stddraw.text(menu_x + 2.5, menu_y + 0.75, text_to_display)
     # menu interaction loop
     while True:
-        # display the menu and wait for a short time (50 ms)
-        stddraw.show(50)
+        # display the menu and wait until the user does something
+        await runner.show_on_event()
         # check if the mouse has been left-clicked
         if stddraw.mousePressed():
             # get the x and y coordinates of the location at which the mouse has
@@ -274,34 +455,33 @@ def difficultyMenu(full_grid_width):
             mouse_x, mouse_y = stddraw.mouseX(), stddraw.mouseY()
             if easy_x <= mouse_x <= easy_x + button_w:
                 if easy_y <= mouse_y <= easy_y + button_h:
-                    return 250  # easy mode value
+                    return play, layout, 250  # easy mode value
             if easy_x <= mouse_x <= easy_x + button_w:
                 if medium_y <= mouse_y <= medium_y + button_h:
-                    return 150
+                    return play, layout, 150
             if easy_x <= mouse_x <= easy_x + button_w:
                 if hard_y <= mouse_y <= hard_y + button_h:
-                    return 50
+                    return play, layout, 50
             if menu_x <= mouse_x <= menu_x + menu_w:
                 if menu_y <= mouse_y <= menu_y + menu_h:
-                    start()
-                    break
+                    return display_game_menu, layout
 
 
-def game_over_menu(full_grid_width, full_grid_height, score):
+# Scene for displaying the score when the game ends
+async def game_over_menu(runner, layout, score):
+    use_scale(MENU_LAYOUT)
+    # the menu was designed with the width and the height swapped
+    full_grid_width, full_grid_height = MENU_LAYOUT.full_grid_h, MENU_LAYOUT.full_grid_w
     # colors used for the menu
     background_color = Color(160, 160, 160)
     button_color = Color(255, 200, 25)
     text_color = Color(64, 64, 64)
     # clear the background canvas to background_color
     stddraw.clear(background_color)
-    # get the directory in which this python code file is placed
-    current_dir = os.path.dirname(os.path.realpath(__file__))
-    # path of the image file
-    img_file = current_dir + "/game_over_1.png"
     # center coordinates to display the image
     img_center_x, img_center_y = (full_grid_width - 4) / 2, full_grid_height - 3
-    # image is represented using the Picture class
-    image_to_display = Picture(img_file)
+    # the image is read from the disk only once
+    image_to_display = picture.load(GAME_OVER_IMAGE)
     # display the image
     stddraw.picture(image_to_display, img_center_x - 0.5, img_center_y + 1)
     # dimensions of the start game button
@@ -313,7 +493,7 @@ def game_over_menu(full_grid_width, full_grid_height, score):
     stddraw.filledRectangle(button_blc_x, button_blc_y, button_w, button_h)
     # display the text on the start game button
     stddraw.setFontFamily("Arial")
-    stddraw.setFontSize(40)
+    stddraw.setFontSize(menu_font_size(layout, 40))
     stddraw.setPenColor(text_color)
     text_to_display = "Main Menu"
     stddraw.text(img_center_x - 0.5, 5, text_to_display)
@@ -327,8 +507,8 @@ def game_over_menu(full_grid_width, full_grid_height, score):
     stddraw.text(img_center_x - 0.5, 10.5, text)
 
     while True:
-        # display the menu and wait for a short time (50 ms)
-        stddraw.show(50)
+        # display the menu and wait until the user does something
+        await runner.show_on_event()
         # check if the mouse has been left-clicked
         if stddraw.mousePressed():
             # get the x and y coordinates of the location at which the mouse has
@@ -338,11 +518,44 @@ def game_over_menu(full_grid_width, full_grid_height, score):
                 if button_blc_y <= mouse_y <= button_blc_y + button_h:
                     # used when the game ends
                     # the user wants to play again
-                    start()
-                    break  # break the loop to end the method and start the game
+                    return display_game_menu, layout
 
 
 # start() function is specified as the entry point (main function) from which
 # the program starts execution
 if __name__ == '__main__':
-    start()
+    parser = argparse.ArgumentParser(description="Tetris 2048")
+    parser.add_argument("--render-thread", action="store_true",
+                        help="draw the game grid on a separate render thread")
+    parser.add_argument("--profile-format", choices=["collapsed", "pstats"],
+                        default=profile_format,
+                        help="format of the profiles started with the F9 key")
+    parser.add_argument("--profile-seconds", type=float, default=profile_seconds,
+                        help="length of the profiles started with the F9 key")
+    parser.add_argument("--track-allocations", action="store_true",
+                        help="report the allocations made in each frame at exit")
+    parser.add_argument("--defer-collections", action="store_true",
+                        help="freeze the startup objects and make the full garbage "
+                             "collections while the game is idle")
+    parser.add_argument("--record", metavar="DIR",
+                        help="record the frames shown to the given directory")
+    parser.add_argument("--record-format", choices=["png", "raw"], default=record_format,
+                        help="format of the recorded frames")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="default",
+                        help="size of the game grid and of its cells")
+    parser.add_argument("--grid-height", type=int, help="number of rows of the game grid")
+    parser.add_argument("--grid-width", type=int, help="number of columns of the game grid")
+    parser.add_argument("--cell-size", type=int, help="size of a grid cell (in pixels)")
+    parser.add_argument("--render-mode", choices=GameGrid.RENDER_MODES,
+                        help="way of drawing the game grid (default: raster for large grids)")
+    args = parser.parse_args()
+    grid_h, grid_w, cell_size = PRESETS[args.preset]
+    use_render_thread = args.render_thread
+    profile_format = args.profile_format
+    profile_seconds = args.profile_seconds
+    track_allocations = args.track_allocations
+    defer_collections = args.defer_collections
+    record_dir = args.record
+    record_format = args.record_format
+    render_mode = args.render_mode
+    start(args.grid_height or grid_h, args.grid_width or grid_w, args.cell_size or cell_size)
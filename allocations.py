@@ -0,0 +1,241 @@
+import gc  # used for controlling the garbage collector
+import linecache  # used for showing the source lines of the allocation sites
+import sys
+import time  # used for the time between the full collections
+import tracemalloc  # used for tracing the memory allocations
+
+import stddraw  # the stddraw module is used as a basic graphics library
+
+
+# Class used for finding the allocations made in each frame of the game: a
+# tracemalloc snapshot is taken each time a frame is shown and compared with
+# the snapshot of the previous frame, and the sizes and counts of the blocks
+# allocated (and not freed) in the frames are summed for each allocation site.
+# The short-lived blocks (allocated and freed in the same frame, e.g. the
+# points of the moving tiles) are not in the snapshots, they are measured by
+# the peak of the traced memory in each frame over the memory at its start
+class AllocationTracker:
+    # Constructor that creates a tracker reporting the given number of sites
+    def __init__(self, top=10):
+        self.top = top
+        self.frame_count = 0
+        # total size (in bytes) of the blocks allocated in the frames
+        self.total_bytes = 0
+        # allocation site (file name, line number) -> [bytes, blocks]
+        self.sites = {}
+        self.previous = None
+        # traced memory at the start of the current frame, and the sum and the
+        # largest of the peaks of the frames over the memory at their start
+        self.frame_start = 0
+        self.total_peak_bytes = 0
+        self.max_peak_bytes = 0
+
+    # Method for starting the tracking, the allocations are compared each time
+    # the canvas is shown by stddraw
+    def start(self):
+        tracemalloc.start()
+        self.previous = self._snapshot()
+        self._start_frame()
+        stddraw.addFrameListener(self.frame)
+
+    # Method for stopping the tracking
+    def stop(self):
+        stddraw.removeFrameListener(self.frame)
+        self.previous = None
+        tracemalloc.stop()
+
+    # Method called when a frame is shown, it adds the allocations made since
+    # the previous frame to the allocation sites
+    def frame(self, surface=None):
+        peak_bytes = tracemalloc.get_traced_memory()[1] - self.frame_start
+        self.total_peak_bytes += peak_bytes
+        self.max_peak_bytes = max(self.max_peak_bytes, peak_bytes)
+        snapshot = self._snapshot()
+        for stat in snapshot.compare_to(self.previous, "lineno"):
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            site = self.sites.setdefault((frame.filename, frame.lineno), [0, 0])
+            site[0] += stat.size_diff
+            site[1] += max(stat.count_diff, 0)
+            self.total_bytes += stat.size_diff
+        self.frame_count += 1
+        self.previous = snapshot
+        self._start_frame()
+
+    # Method for starting the peak of the next frame from the memory traced
+    # now (the snapshots taken by the tracker are not counted in the frames)
+    def _start_frame(self):
+        tracemalloc.reset_peak()
+        self.frame_start = tracemalloc.get_traced_memory()[0]
+
+    # Method for taking a snapshot without the allocations of tracemalloc
+    # itself and of this module
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    # Method for getting the sites that allocated the most bytes per frame as a
+    # list of (file name, line number, bytes per frame, blocks per frame)
+    def top_sites(self):
+        frames = max(self.frame_count, 1)
+        sites = sorted(self.sites.items(), key=lambda item: item[1][0], reverse=True)
+        return [(filename, lineno, size / frames, count / frames)
+                for (filename, lineno), (size, count) in sites[:self.top]]
+
+    # Method for printing the allocations per frame and the top allocation sites
+    def report(self, file=sys.stdout):
+        frames = max(self.frame_count, 1)
+        print("%d frames, %.0f bytes allocated and not freed per frame"
+              % (self.frame_count, self.total_bytes / frames), file=file)
+        print("peak of the short-lived allocations: %.0f bytes per frame, %.0f bytes at most"
+              % (self.total_peak_bytes / frames, self.max_peak_bytes), file=file)
+        for filename, lineno, size, count in self.top_sites():
+            line = linecache.getline(filename, lineno).strip()
+            print("%10.0f B %8.1f blocks  %s:%d  %s" % (size, count, filename, lineno, line),
+                  file=file)
+
+
+# Function for moving all the objects created at startup (modules, fonts,
+# images, tables) to the permanent generation, so that the collections made
+# while the game is played do not scan them again
+def freeze_startup_objects():
+    gc.collect()
+    gc.freeze()
+
+
+# Class used for keeping the full (generation 2) collections, which take the
+# longest, out of the frames of the game: the automatic collections are kept
+# for the young generations only, and full collections are made when the game
+# is idle (waiting between two steps, or waiting for the user in a menu)
+class CollectionScheduler:
+    # threshold of generation 2 that keeps the automatic full collections from
+    # running (the young collections are not affected)
+    deferred_threshold = 1 << 30
+
+    # Constructor that creates a scheduler making a full collection at most
+    # once every interval seconds
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.last_collection = time.perf_counter()
+        self.thresholds = None
+        self.collection_count = 0
+
+    # Method for turning off the automatic full collections
+    def start(self):
+        self.thresholds = gc.get_threshold()
+        gc.set_threshold(self.thresholds[0], self.thresholds[1], CollectionScheduler.deferred_threshold)
+
+    # Method for turning the automatic full collections back on
+    def stop(self):
+        gc.set_threshold(*self.thresholds)
+
+    # Method called when the game is idle, it makes a full collection when the
+    # previous one is at least interval seconds old
+    def idle(self):
+        now = time.perf_counter()
+        if now - self.last_collection >= self.interval:
+            gc.collect()
+            self.collection_count += 1
+            self.last_collection = time.perf_counter()
+
+
+# Function for measuring the net memory (in bytes) allocated by calling the
+# given function count times; it is first called warmup times while tracing, so
+# that the blocks it replaces are traced when they are freed and the one-time
+# allocations of the interpreter (e.g. specialized calls) are already made
+def net_allocation(function, count=10, warmup=10):
+    tracemalloc.start()
+    for i in range(warmup):
+        function()
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        function()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before
+
+
+# Function for measuring the memory (in bytes) allocated while the given
+# function runs, including the blocks it frees before it returns: the peak of
+# the traced memory over the memory at the start of each of the count calls
+# (after warmup calls, as in net_allocation). The blocks allocated by the
+# measurement itself are measured with a function doing nothing and are not
+# counted. It returns the mean and the largest peak; a function that
+# allocates nothing has the peak 0
+def peak_allocation(function, count=10, warmup=10):
+    tracemalloc.start()
+    for i in range(warmup):
+        function()
+    gc.collect()
+    overhead = min(_peaks(lambda: None, count))
+    peaks = [max(peak - overhead, 0) for peak in _peaks(function, count)]
+    tracemalloc.stop()
+    return sum(peaks) / count, max(peaks)
+
+
+# Function for getting the peaks of count calls of the given function (see
+# peak_allocation) while tracing
+def _peaks(function, count):
+    peaks = [0] * count
+    # the int read before each call replaces (and frees) the one read before
+    # the previous call, so there is one to replace before the first call too
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        # the peak is reset after the memory is read, so that the blocks of the
+        # reading are not in the peak
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        function()
+        peaks[i] = tracemalloc.get_traced_memory()[1] - before
+    return peaks
+
+
+# Memory (in bytes) a gravity tick may allocate and free while it runs: the
+# tetromino keeps its tiles in tuples and moves their points in place, so a
+# tick only allocates the iterator of a loop over the tiles, one at a time
+TICK_PEAK_BYTES = sys.getsizeof(iter(()))
+
+
+# Function for creating a tall game grid without tiles and a T tetromino at the
+# top of it, for measuring the allocations of the gravity ticks
+def create_falling_tetromino(grid_h=250, grid_w=12):
+    from game_grid import GameGrid
+    from tetromino import Tetromino
+
+    grid = GameGrid(grid_h, grid_w, grid_h, grid_w + grid_w / 3)
+    tetromino = Tetromino('T', grid_h, grid_w)
+    tetromino.position()
+    grid.current_tetromino = tetromino
+    return grid, tetromino
+
+
+# Checks that a steady gravity tick (the current tetromino moving down by one
+# on a board without merges) keeps no memory allocated after the tick, and
+# that the memory it allocates and frees while it runs is at most
+# TICK_PEAK_BYTES. A few bytes kept once by the interpreter are allowed, so
+# the check is made over a long fall on a tall grid:
+#   python allocations.py
+def _main():
+    grid, tetromino = create_falling_tetromino()
+    ticks = 200
+    net_bytes = net_allocation(lambda: tetromino.move("down", grid), count=ticks)
+    print("net allocation of %d gravity ticks: %d bytes" % (ticks, net_bytes))
+    # the fall of the first check ends 200 rows lower
+    tetromino.position()
+    mean_peak, max_peak = peak_allocation(lambda: tetromino.move("down", grid), count=ticks)
+    print("allocated and freed in a gravity tick: %.0f bytes at the peak (%d at most)"
+          % (mean_peak, max_peak))
+    if net_bytes >= ticks:
+        print("a gravity tick keeps memory allocated")
+        sys.exit(1)
+    if mean_peak > TICK_PEAK_BYTES:
+        print("a gravity tick allocates more than %d bytes" % TICK_PEAK_BYTES)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    _main()
@@ -0,0 +1,419 @@
+import argparse  # used for parsing the command line arguments
+import contextlib  # used for hiding the output of the game
+import gc  # used for collecting the garbage before measuring the memory
+import json  # used for saving the results
+import os
+import random  # used for creating reproducible game states
+import statistics  # used for summarizing repeated measurements
+import subprocess  # used for starting the game in a new process
+import sys
+import time
+import timeit  # used for timing the measured operations
+import tracemalloc  # used for measuring the memory used by the objects
+
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
+
+from allocations import peak_allocation
+from color import Color
+from game_grid import GameGrid
+from point import Point
+from tetromino import Tetromino
+from tile import Tile
+
+
+# Function for measuring the memory (in bytes) used by each object that is
+# created by the given factory function
+def bytes_per_object(factory, count=10000):
+    objects = [None] * count  # allocated before the measurement starts
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        objects[i] = factory()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+# Function for measuring the memory (in bytes) allocated by a call of the given
+# function, including the blocks it frees before it returns (the mean peak of
+# the traced memory over the memory at the start of the call)
+def bytes_allocated_per_call(function, count=1000):
+    return peak_allocation(function, count)[0]
+
+
+# Function for measuring the average time (in microseconds) of calling the
+# given function
+def microseconds_per_call(function, number=20000):
+    seconds = min(timeit.repeat(function, number=number, repeat=3))
+    return seconds / number * 1e6
+
+
+# Function for creating a game grid with some tiles on it and a tetromino that
+# is about to land on them
+def create_game_state(grid_h=20, grid_w=12, seed=0):
+    random.seed(seed)
+    grid = GameGrid(grid_h, grid_w, grid_h, grid_w + grid_w / 3)
+    for row in range(4):
+        for col in range(grid_w):
+            if random.random() < 0.7:
+                grid.tile_matrix[row][col] = Tile(Point(col, row))
+    tetromino = Tetromino('T', grid_h, grid_w)
+    tetromino.position()
+    # move the tetromino down next to the tiles
+    for i in range(grid_h - 6):
+        tetromino.move("down", grid)
+    grid.current_tetromino = tetromino
+    return grid, tetromino
+
+
+# Benchmark for the memory used by the value objects, and the time spent and
+# the memory allocated in the methods that check the positions of the tiles
+def benchmark_objects():
+    results = {}
+    results["point_bytes"] = bytes_per_object(lambda: Point(1, 2))
+    results["color_bytes"] = bytes_per_object(lambda: Color(1, 2, 3))
+    results["tile_bytes"] = bytes_per_object(lambda: Tile(Point(1, 2)))
+    grid, tetromino = create_game_state()
+    tile = tetromino.tile_matrix[1][1]
+    results["get_position_us"] = microseconds_per_call(tile.get_position)
+    # memory allocated in a call, and kept by the returned position (a copy of
+    # the position is kept, the position itself is not)
+    results["get_position_alloc_bytes"] = bytes_allocated_per_call(tile.get_position)
+    results["get_position_kept_bytes"] = bytes_per_object(tile.get_position)
+    for direction in ("left", "right", "down"):
+        results["can_be_moved_" + direction + "_us"] = microseconds_per_call(
+            lambda: tetromino.can_be_moved(direction, grid))
+        results["can_be_moved_" + direction + "_alloc_bytes"] = bytes_allocated_per_call(
+            lambda: tetromino.can_be_moved(direction, grid))
+    # rotating back and forth leaves the tetromino as it was
+    rotate_back_and_forth = lambda: (tetromino.canRotate(grid, 1), tetromino.canRotate(grid, -1))
+    results["can_rotate_us"] = microseconds_per_call(rotate_back_and_forth, 5000) / 2
+    results["can_rotate_alloc_bytes"] = bytes_allocated_per_call(rotate_back_and_forth) / 2
+    empty_grid = GameGrid(20, 12, 20, 16)
+    place = lambda: empty_grid.update_grid(tetromino.tile_matrix)
+    results["update_grid_us"] = microseconds_per_call(place)
+    results["update_grid_alloc_bytes"] = bytes_allocated_per_call(place)
+    return results
+
+
+# Program run in a new process by benchmark_startup, it starts the game without
+# a display and reports the times (in seconds after the start of the process)
+# when Tetris_2048 has been imported and when the first menu frame is shown
+STARTUP_PROGRAM = """
+import os, sys, time
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+import stddraw
+import Tetris_2048
+imported = time.perf_counter()
+
+def first_frame():
+    print(imported, time.perf_counter(), 'tkinter' in sys.modules, flush=True)
+    os._exit(0)
+
+stddraw.present = first_frame
+Tetris_2048.start()
+"""
+
+
+# Benchmark for the time from launching the game to showing the first menu frame
+def benchmark_startup(repeat=5):
+    directory = os.path.dirname(os.path.realpath(__file__))
+    launch_times, import_times, frame_times = [], [], []
+    for i in range(repeat):
+        # the process start time is taken from the same clock as the child's
+        # time.perf_counter() values (both use CLOCK_MONOTONIC on Linux)
+        launched = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", STARTUP_PROGRAM], cwd=directory,
+                                capture_output=True, text=True, check=True).stdout
+        imported, first_frame, tkinter_imported = output.split()
+        launch_times.append(float(first_frame) - launched)
+        import_times.append(float(imported) - launched)
+        frame_times.append(float(first_frame) - float(imported))
+    return {
+        "launch_to_first_menu_frame_ms": statistics.median(launch_times) * 1000,
+        "launch_to_imported_ms": statistics.median(import_times) * 1000,
+        "imported_to_first_menu_frame_ms": statistics.median(frame_times) * 1000,
+        "tkinter_imported": float(tkinter_imported == "True"),
+    }
+
+
+# Function for drawing on a canvas that is not shown (with the SDL dummy video
+# driver unless another driver is selected), the canvas is shared by all the
+# benchmarks run in a process
+def use_offscreen_canvas():
+    import stddraw
+    if not stddraw._windowCreated:
+        stddraw.setOffscreen()
+
+
+# Function for counting the frames on the call stack of the caller
+def stack_depth():
+    depth, frame = 0, sys._getframe(1)
+    while frame is not None:
+        depth, frame = depth + 1, frame.f_back
+    return depth
+
+
+# Benchmark for the memory and the call stack used by the game over many
+# restarts: the scenes are run without waiting and a scripted player starts a
+# hard game from the main menu, restarts it with the R key and goes back to the
+# main menu from the game over menu
+def benchmark_restarts(count=1000):
+    import pygame
+    import stddraw
+    import Tetris_2048
+    from scene_runner import SceneRunner
+
+    use_offscreen_canvas()
+    layout = Tetris_2048.create_layout()
+    Tetris_2048.setup_canvas(layout)
+
+    # the buttons clicked in the menus are all at this position
+    button_pos = (int(stddraw._scaleX((layout.full_grid_w - 1) / 2)), int(stddraw._scaleY(5)))
+    click = pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=button_pos)
+    restart_key = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_r)
+    runner = SceneRunner(time_scale=0)
+    # the different depths of the call stack seen when a scene starts, and the
+    # memory used after every 100 restarts
+    depths, memory = set(), []
+
+    def play_scene(scene, args):
+        depths.add(stack_depth())
+        if scene is Tetris_2048.play:
+            pygame.event.post(restart_key)
+            return
+        if scene is Tetris_2048.display_game_menu:
+            restarts = runner.scene_count // 4
+            if restarts % 100 == 0:
+                gc.collect()
+                memory.append(tracemalloc.get_traced_memory()[0])
+            if restarts == count:
+                raise SystemExit
+        pygame.event.post(click)
+
+    runner.scene_listeners.append(play_scene)
+    tracemalloc.start()
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            runner.run(Tetris_2048.display_game_menu, layout)
+        except SystemExit:
+            pass
+    seconds = time.perf_counter() - started
+    tracemalloc.stop()
+    return {
+        "restarts": count,
+        "seconds": seconds,
+        "max_stack_depth": max(depths),
+        "min_stack_depth": min(depths),
+        # memory after the first 100 restarts and its growth until the end
+        "memory_kb": memory[1] / 1024,
+        "memory_growth_kb": (memory[-1] - memory[1]) / 1024,
+    }
+
+
+# recorded keys typed by the player in the frame time benchmark, one key (or no
+# key for None) is typed before each frame and the script is repeated
+KEY_SCRIPT = ["left", "left", None, "a", None, "down", "down", None, None,
+              "right", "d", None, "right", "right", None, "down", None, None,
+              "space", None, None, "left", None, "d", "d", None, "down", None]
+
+# difficulties (the speeds selected in the difficulty menu, in ms) and board
+# sizes (rows, columns, cell size in pixels) the frame times are measured for,
+# the board of the stress preset of the game is measured as well
+FRAME_SPEEDS = (250, 150, 50)
+FRAME_BOARD_SIZES = ((20, 12, 40), (40, 24, 40))
+
+
+# Function for getting the board sizes (rows, columns, cell size) of the frame
+# time benchmark and the board of the stress preset of the game
+def benchmark_boards():
+    import Tetris_2048
+    return FRAME_BOARD_SIZES + (Tetris_2048.PRESETS["stress"],)
+
+
+# Function for summarizing the given times (in seconds) as percentiles in ms
+def percentiles_ms(times, prefix):
+    times = sorted(times)
+    results = {}
+    for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        results[prefix + name + "_ms"] = times[min(int(fraction * len(times)), len(times) - 1)] * 1000
+    results[prefix + "max_ms"] = times[-1] * 1000
+    return results
+
+
+# Function for playing the given number of frames of the real game loop
+# (Tetris_2048.play) with the given board size, cell size and speed, the keys of
+# KEY_SCRIPT are posted as pygame events and read by the game through stddraw
+# as in live play; it returns the time of each frame and the part of it spent
+# on the game logic and the drawing (the rest is spent waiting for the next
+# step of the game)
+def play_frames(grid_h, grid_w, cell_size, speed, frame_count, seed=0):
+    import pygame
+    import stddraw
+    import Tetris_2048
+    from scene_runner import SceneRunner
+
+    # time spent waiting between the frames, by the game loop through the
+    # runner and by the animations of the game grid through stddraw.wait
+    waiting = {"seconds": 0.0, "in_runner": False}
+    stddraw_wait = stddraw.wait
+
+    class TimedRunner(SceneRunner):
+        async def wait(self, msec):
+            started = time.perf_counter()
+            waiting["in_runner"] = True
+            await SceneRunner.wait(self, msec)
+            waiting["in_runner"] = False
+            waiting["seconds"] += time.perf_counter() - started
+
+    def timed_wait(msec):
+        started = time.perf_counter()
+        stddraw_wait(msec)
+        if not waiting["in_runner"]:
+            waiting["seconds"] += time.perf_counter() - started
+
+    # the game ends after the frames are played, the game over menu is skipped
+    async def play_game(runner, layout, speed):
+        await Tetris_2048.play(runner, layout, speed)
+
+    key_events = [None if key is None else
+                  pygame.event.Event(pygame.KEYDOWN, key=pygame.key.key_code(key))
+                  for key in KEY_SCRIPT]
+    restart = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_r)
+    frame_times, work_times = [], []
+    runner = TimedRunner()
+    last = [None, 0.0]  # time and waiting time of the previous frame
+
+    def frame_shown(surface):
+        now = time.perf_counter()
+        if last[0] is not None:
+            frame_times.append(now - last[0])
+            work_times.append(now - last[0] - (waiting["seconds"] - last[1]))
+        last[0], last[1] = now, waiting["seconds"]
+        if len(frame_times) >= frame_count:
+            pygame.event.post(restart)
+            return
+        event = key_events[len(frame_times) % len(key_events)]
+        if event is not None:
+            pygame.event.post(event)
+
+    use_offscreen_canvas()
+    layout = Tetris_2048.create_layout(grid_h, grid_w, cell_size)
+    # the numbers on the tiles are scaled with the cells as in the game
+    default_cell_size = Tile.cell_size
+    Tile.set_cell_size(cell_size)
+    Tetris_2048.setup_canvas(layout)
+    random.seed(seed)
+    stddraw.addFrameListener(frame_shown)
+    stddraw.wait = timed_wait
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            # a new game is started when a game is over before all the frames
+            while len(frame_times) < frame_count:
+                last[0] = None
+                runner.run(play_game, layout, speed)
+    finally:
+        stddraw.wait = stddraw_wait
+        Tile.set_cell_size(default_cell_size)
+        stddraw.removeFrameListener(frame_shown)
+        pygame.event.clear()
+    return frame_times, work_times
+
+
+# Benchmark for the frame times of the real game loop with scripted input, for
+# each difficulty and board size
+def benchmark_frames(frame_count=100):
+    results = {}
+    for grid_h, grid_w, cell_size in benchmark_boards():
+        for speed in FRAME_SPEEDS:
+            frame_times, work_times = play_frames(grid_h, grid_w, cell_size, speed,
+                                                  frame_count)
+            prefix = "%dx%d_speed%d_" % (grid_h, grid_w, speed)
+            results.update(percentiles_ms(frame_times, prefix + "frame_"))
+            results.update(percentiles_ms(work_times, prefix + "work_"))
+    return results
+
+
+# Function for measuring the time (in microseconds) of a step of the array
+# engine with the given set of kernels, on seeded games played with random keys
+def microseconds_per_step(grid_h, grid_w, kernels, step_count=20000):
+    from board_engine import BoardEngine
+    from headless_game import KEYS
+
+    engine = BoardEngine(grid_h, grid_w, kernels)
+    player = random.Random(0)
+    seed = 0
+    engine.reset(seed)
+    # a warm-up, so that the compiled kernels are compiled (or loaded from the
+    # cache) before the steps are timed
+    for i in range(100):
+        if engine.step(player.choice(KEYS)):
+            break
+    engine.reset(seed)
+    elapsed = 0.0
+    for i in range(step_count):
+        key = player.choice(KEYS)
+        started = time.perf_counter()
+        game_over = engine.step(key)
+        elapsed += time.perf_counter() - started
+        if game_over:
+            seed += 1
+            engine.reset(seed)
+    return elapsed / step_count * 1e6
+
+
+# Benchmark for the array engine with each available set of kernels (NumPy and,
+# when Numba is installed, the compiled kernels), for each board of the frame
+# time benchmark
+def benchmark_kernels():
+    from board_engine import KERNELS
+
+    results = {}
+    for grid_h, grid_w, cell_size in benchmark_boards():
+        for name in KERNELS:
+            results["%dx%d_%s_step_us" % (grid_h, grid_w, name)] = microseconds_per_step(
+                grid_h, grid_w, name)
+    return results
+
+
+# benchmarks that can be selected from the command line
+BENCHMARKS = {
+    "objects": benchmark_objects,
+    "startup": benchmark_startup,
+    "restarts": benchmark_restarts,
+    "frames": benchmark_frames,
+    "kernels": benchmark_kernels,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for Tetris 2048")
+    parser.add_argument("names", nargs="*", default=list(BENCHMARKS),
+                        help="benchmarks to run (default: all of them)")
+    parser.add_argument("--json", help="file for saving the results as JSON")
+    parser.add_argument("--baseline",
+                        help="JSON file of earlier results (saved with --json) to compare with")
+    args = parser.parse_args(argv)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    all_results = {}
+    for name in args.names:
+        results = BENCHMARKS[name]()
+        all_results[name] = results
+        for key, value in results.items():
+            before = baseline.get(name, {}).get(key)
+            if before:
+                print("%s.%s: %.3f (baseline %.3f, x%.2f)" % (name, key, value, before,
+                                                            value / before))
+            else:
+                print("%s.%s: %.3f" % (name, key, value))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(all_results, file, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
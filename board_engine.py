@@ -0,0 +1,504 @@
+import collections  # used for the sets of kernels
+import random  # used for the tetrominoes and the numbers of the tiles
+
+import numpy as np  # fundamental Python module for scientific computing
+
+# A game engine playing by the same rules as GameGrid and Tetromino, with the
+# board stored as an array of tile exponents instead of Tile objects: the cell
+# of a tile with the number 2 ** k holds k, and an empty cell holds 0 (as in
+# GameGrid.exponent_matrix). The rules are reproduced exactly, including the
+# ones that may look surprising (a merge drops the tiles above it by one row,
+# only the first merge of each row is made in a pass, a row that moves down
+# into a cleared row is not checked in the same pass, ...), and the random
+# numbers are drawn in the same order, so a game seeded with the same seed
+# plays exactly like the game of the legacy rules (see equivalence.py).
+#
+# The work on the board is made by four kernels (merging, finding the full
+# rows, dropping the floating tiles and finding the landing distance of a
+# drop); the NumPy kernels below are always available, and the compiled
+# kernels of jit_kernels are used instead when Numba is installed.
+
+# types of the tetrominoes in the order they are drawn by Tetromino.random
+TYPES = ('I', 'O', 'Z', 'L', 'J', 'S', 'T')
+# size of the tile matrix and (column index, row index) of each tile in the
+# initial orientation of each type of tetromino, in the order of Tetromino
+SHAPES = {
+    'I': (4, ((1, 0), (1, 1), (1, 2), (1, 3))),
+    'O': (2, ((0, 0), (1, 0), (0, 1), (1, 1))),
+    'Z': (3, ((0, 0), (1, 0), (1, 1), (2, 1))),
+    'L': (3, ((1, 0), (1, 1), (1, 2), (2, 2))),
+    'J': (3, ((1, 0), (1, 1), (1, 2), (0, 2))),
+    'S': (3, ((0, 1), (1, 1), (1, 0), (2, 0))),
+    'T': (3, ((0, 1), (1, 1), (1, 2), (2, 1))),
+}
+
+
+# Exception raised when the current tetromino is dropped but it can fall
+# forever: canRotate does not check the tiles after an empty cell of a row, so
+# the tiles of a rotated tetromino can be below the bottom of the grid, and then
+# Tetromino.drop of the legacy rules never returns (HeadlessGame raises it
+# before making such a drop)
+class EndlessDropError(RuntimeError):
+    pass
+
+
+# Class used for representing a tetromino: the exponents of its tiles and
+# their positions on the grid, stored in n x n lists indexed like the tile
+# matrix of Tetromino (the exponent is 0 where there is no tile), and the
+# position of its bottom left corner
+class Piece:
+    __slots__ = ('type', 'n', 'cells', 'xs', 'ys', 'x', 'y')
+
+    # Constructor that creates a tetromino of the given type, the number of
+    # each tile is drawn from the given random number generator
+    def __init__(self, type, rng):
+        self.type = type
+        n, occupied = SHAPES[type]
+        self.n = n
+        self.cells = [[0] * n for i in range(n)]
+        self.xs = [[0] * n for i in range(n)]
+        self.ys = [[0] * n for i in range(n)]
+        for col, row in occupied:
+            # 2 (exponent 1) or 4 (exponent 2), as in the constructor of Tile
+            self.cells[row][col] = 1 if rng.randint(0, 1) == 0 else 2
+        self.x, self.y = 0, 0
+
+    # Method for putting the tetromino just above the grid at a random column
+    def position(self, rng, grid_h, grid_w):
+        n, occupied = SHAPES[self.type]
+        self.x, self.y = rng.randint(0, grid_w - n), grid_h
+        for col, row in occupied:
+            self.xs[row][col] = self.x + col
+            self.ys[row][col] = self.y + (n - 1) - row
+
+    # Method for moving all the tiles by dx and dy
+    def shift(self, dx, dy):
+        self.x += dx
+        self.y += dy
+        for row in range(self.n):
+            for col in range(self.n):
+                self.xs[row][col] += dx
+                self.ys[row][col] += dy
+
+    # Method for rotating the tiles around the cell above and on the right of
+    # the bottom left corner, and the tile matrix with them (1 for clockwise)
+    def rotate(self, rot_dir):
+        n = self.n
+        center_x, center_y = self.x + 1, self.y + 1
+        cells = [[0] * n for i in range(n)]
+        xs = [[0] * n for i in range(n)]
+        ys = [[0] * n for i in range(n)]
+        for row in range(n):
+            for col in range(n):
+                if rot_dir == -1:
+                    new_row, new_col = n - col - 1, row
+                else:
+                    new_row, new_col = col, n - row - 1
+                cells[new_row][new_col] = self.cells[row][col]
+                x, y = self.xs[row][col], self.ys[row][col]
+                if self.cells[row][col]:
+                    relative_x, relative_y = x - center_x, y - center_y
+                    if rot_dir == 1:
+                        x, y = relative_y + center_x, -relative_x + center_y
+                    else:
+                        x, y = -relative_y + center_x, relative_x + center_y
+                xs[new_row][new_col], ys[new_row][new_col] = x, y
+        self.cells, self.xs, self.ys = cells, xs, ys
+
+    # Method for rotating only the numbers of the tiles (the O tetromino)
+    def rotate_numbers(self, rot_dir):
+        n = self.n
+        cells = [[0] * n for i in range(n)]
+        for row in range(n):
+            for col in range(n):
+                if rot_dir == -1:
+                    cells[n - col - 1][row] = self.cells[row][col]
+                else:
+                    cells[col][n - row - 1] = self.cells[row][col]
+        self.cells = cells
+
+    # Method for getting the tetromino as a tuple of the x and y of its bottom
+    # left corner and (row, column, x, y, exponent) for each of its tiles
+    def state(self):
+        tiles = tuple((row, col, self.xs[row][col], self.ys[row][col], self.cells[row][col])
+                      for row in range(self.n) for col in range(self.n) if self.cells[row][col])
+        return (self.x, self.y) + tiles
+
+
+# Function for merging the tiles with the same number on top of each other
+# (GameGrid.merge), the tiles in rows below border are dropped after a merge;
+# it returns the score of the merges
+def merge_tiles(board, border):
+    height = board.shape[0]
+    score = 0
+    while True:
+        # candidates[r - 1, c] is True when the tile in row r and column c can
+        # be merged with the tile below it
+        candidates = (board[1:] != 0) & (board[1:] == board[:-1])
+        if not candidates.any():
+            return score
+        # a pass over the rows from the bottom, with the first merge of each
+        # row only; a merge changes a single column, so the candidates of the
+        # other columns do not have to be found again
+        row = 1
+        while row < height:
+            rows = np.flatnonzero(candidates[row - 1:].any(axis=1))
+            if rows.size == 0:
+                break
+            row += int(rows[0])
+            col = int(np.argmax(candidates[row - 1]))
+            board[row - 1, col] += 1
+            score += 1 << int(board[row - 1, col])
+            board[row, col] = 0
+            # each tile above the merge (up to the border) is dropped by one row
+            # if the cell below it is empty
+            for i in range(row + 1, border):
+                if board[i, col] != 0 and board[i - 1, col] == 0:
+                    board[i - 1, col] = board[i, col]
+                    board[i, col] = 0
+            column = board[:, col]
+            candidates[:, col] = (column[1:] != 0) & (column[1:] == column[:-1])
+            row += 1
+
+
+# Function for finding the full rows, it returns an array with True for each
+# row that has a tile in each of its cells
+def full_rows(board):
+    return (board != 0).all(axis=1)
+
+
+# Function for clearing the full rows (GameGrid.clearLines) given by full (as
+# returned by full_rows), it returns the score of the cleared tiles
+def clear_rows(board, full):
+    rows = np.flatnonzero(full)
+    if rows.size == 0:
+        return 0
+    # the rows above a cleared row move down by one and the row that moves into
+    # the cleared row is not checked, so a full row right above a cleared row
+    # is not cleared
+    cleared, last = [], None
+    for row in rows.tolist():
+        if last is not None and row == last + 1:
+            continue
+        cleared.append(row)
+        last = row
+    score = sum(1 << int(exponent) for exponent in board[cleared].flat)
+    kept = np.delete(board, cleared, axis=0)
+    board[:len(kept)] = kept
+    board[len(kept):] = 0
+    return score
+
+
+# Function for dropping the tile in the given row and column by one row if the
+# cell below it is empty (GameGrid.drop_tile)
+def _drop(board, i, k):
+    if board[i - 1, k] == 0:
+        board[i - 1, k] = board[i, k]
+        board[i, k] = 0
+
+
+# Function for dropping the floating tile in the given row and column, and the
+# tile next to it when the two tiles are floating together, with the checks of
+# GameGrid.remove_gaps; it returns True if a tile is dropped
+def _drop_floating(board, i, k, width):
+    if k == width - 1 or k == width - 2:
+        # only the left side is checked for the last two columns
+        if board[i, k - 1] == 0:
+            _drop(board, i, k)
+            return True
+        if board[i, k - 2] == 0 and board[i - 1, k - 1] == 0 and board[i + 1, k - 1] == 0:
+            _drop(board, i, k)
+            _drop(board, i, k - 1)
+            return True
+    elif k == 0 or k == 1:
+        # only the right side is checked for the first two columns
+        if board[i, k + 1] == 0:
+            _drop(board, i, k)
+            return True
+        if board[i, k + 2] == 0 and board[i - 1, k + 1] == 0 and board[i + 1, k + 1] == 0:
+            _drop(board, i, k)
+            _drop(board, i, k + 1)
+            return True
+    elif board[i, k - 1] == 0:
+        if board[i, k + 1] == 0:
+            _drop(board, i, k)
+            return True
+        if board[i, k + 2] == 0 and board[i - 1, k + 1] == 0 and board[i + 1, k + 1] == 0:
+            _drop(board, i, k)
+            _drop(board, i, k + 1)
+            return True
+    elif board[i, k + 1] == 0:
+        if board[i, k - 2] == 0 and board[i + 1, k - 1] == 0 and board[i - 1, k - 1] == 0:
+            _drop(board, i, k)
+            _drop(board, i, k - 1)
+            return True
+    return False
+
+
+# Function for making a pass over the rows from the top and dropping the
+# floating tiles by one row (a pass of GameGrid.remove_gaps), it returns True
+# if a tile is dropped
+def drop_floating_tiles(board):
+    height, width = board.shape
+    removed = False
+    # rows (from 1) that have a tile with an empty cell below it
+    floating = np.zeros(height, dtype=bool)
+    floating[1:-1] = ((board[1:-1] != 0) & (board[:-2] == 0)).any(axis=1)
+    for i in range(height - 2, 0, -1):
+        if not floating[i]:
+            continue
+        dropped = False
+        for k in np.flatnonzero((board[i] != 0) & (board[i - 1] == 0)).tolist():
+            # an earlier drop in this row may have moved the tile
+            if board[i, k] != 0 and board[i - 1, k] == 0:
+                dropped = _drop_floating(board, i, k, width) or dropped
+        if dropped:
+            removed = True
+            # the tiles dropped into the row below may be floating now
+            if i > 1:
+                floating[i - 1] = ((board[i - 1] != 0) & (board[i - 2] == 0)).any()
+    return removed
+
+
+# Function for finding how many rows the given tiles can move down on the board
+# before one of them lands on a tile or on the bottom of the grid; a tile below
+# the bottom of the grid never lands, and -1 is returned if no tile lands
+def landing_distance(board, xs, ys):
+    height, width = board.shape
+    distance = -1
+    for x, y in zip(xs, ys):
+        if y < 0:
+            continue
+        tile_distance = y
+        if 0 <= x < width:
+            below = np.flatnonzero(board[:min(y, height), x])
+            if below.size:
+                tile_distance = y - int(below[-1]) - 1
+        if distance == -1 or tile_distance < distance:
+            distance = tile_distance
+    return distance
+
+
+# set of the kernels used by an engine
+Kernels = collections.namedtuple("Kernels", ["merge_tiles", "full_rows", "drop_floating_tiles",
+                                             "landing_distance"])
+
+# sets of kernels by name, the compiled kernels are added when Numba is installed
+KERNELS = {"numpy": Kernels(merge_tiles, full_rows, drop_floating_tiles, landing_distance)}
+try:
+    import jit_kernels
+except ImportError:  # Numba is not installed
+    pass
+else:
+    KERNELS["numba"] = Kernels(jit_kernels.merge_tiles, jit_kernels.full_rows,
+                               jit_kernels.drop_floating_tiles, jit_kernels.landing_distance)
+# name of the set of kernels used by default
+DEFAULT_KERNELS = "numba" if "numba" in KERNELS else "numpy"
+
+
+# Class used for playing the game on an exponent board with the rules of
+# GameGrid and Tetromino; it is stepped like HeadlessGame and the same seed
+# gives the same game
+class BoardEngine:
+    # Constructor that creates a game with the given dimensions of the grid,
+    # played with the given set of kernels (a name in KERNELS) on the given
+    # grid_h x grid_w uint8 array (e.g. a part of a larger array shared by
+    # many games) or on a new array if it is None
+    def __init__(self, grid_h=20, grid_w=12, kernels=None, board=None):
+        self.grid_h, self.grid_w = grid_h, grid_w
+        self.kernels_name = kernels or DEFAULT_KERNELS
+        self.kernels = KERNELS[self.kernels_name]
+        self.rng = random.Random()
+        if board is None:
+            board = np.zeros((grid_h, grid_w), dtype=np.uint8)
+        self.board_array = board
+        self.score_value = 0
+        self.over = False
+        self.current_piece = None
+        self.next_piece = None
+        self.piece_count = 0
+
+    # Method for starting a new game, the random number generator is seeded
+    # with the given seed (if it is not None)
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
+        self.board_array[:] = 0
+        self.score_value = 0
+        self.over = False
+        self.current_piece = self.create_piece()
+        self.current_piece.position(self.rng, self.grid_h, self.grid_w)
+        self.next_piece = self.create_piece()
+        self.piece_count = 0
+
+    # Method for creating a tetromino of a random type (Tetromino.random)
+    def create_piece(self):
+        return Piece(TYPES[self.rng.randint(0, len(TYPES) - 1)], self.rng)
+
+    # Method for handling the given key (one of headless_game.KEYS) and moving
+    # the current tetromino down, it returns True when the game is over
+    def step(self, key):
+        piece = self.current_piece
+        if key in ("left", "right", "down"):
+            self.move(key)
+        elif key == "a":
+            self.rotate(-1)
+        elif key == "d":
+            self.rotate(1)
+        elif key == "space":
+            self.drop()
+        if self.move("down"):
+            return False
+        game_over = self.place(piece)
+        self.piece_count += 1
+        if game_over:
+            return True
+        self.next_piece.position(self.rng, self.grid_h, self.grid_w)
+        self.current_piece = self.next_piece
+        self.next_piece = self.create_piece()
+        return False
+
+    # Method for checking whether the given cell is inside the grid and has a
+    # tile on it (GameGrid.is_occupied)
+    def is_occupied(self, row, col):
+        if row < 0 or row >= self.grid_h or col < 0 or col >= self.grid_w:
+            return False
+        return self.board_array[row, col] != 0
+
+    # Method for checking if the current tetromino can be moved in the given
+    # direction (Tetromino.can_be_moved)
+    def can_be_moved(self, direction):
+        piece, n = self.current_piece, self.current_piece.n
+        if direction == "left" or direction == "right":
+            for row in range(n):
+                cols = range(n) if direction == "left" else range(n - 1, -1, -1)
+                for col in cols:
+                    if not piece.cells[row][col]:
+                        continue
+                    x, y = piece.xs[row][col], piece.ys[row][col]
+                    if direction == "left":
+                        if x == 0:
+                            return False
+                        if y >= self.grid_h:
+                            break
+                        if self.is_occupied(y, x - 1):
+                            return False
+                    else:
+                        if x == self.grid_w - 1:
+                            return False
+                        if y >= self.grid_h:
+                            break
+                        if self.is_occupied(y, x + 1):
+                            return False
+                    break
+        else:
+            for col in range(n):
+                for row in range(n - 1, -1, -1):
+                    if not piece.cells[row][col]:
+                        continue
+                    x, y = piece.xs[row][col], piece.ys[row][col]
+                    if y > self.grid_h:
+                        break
+                    if y == 0:
+                        return False
+                    if self.is_occupied(y - 1, x):
+                        return False
+                    break
+        return True
+
+    # Method for moving the current tetromino by one in the given direction if
+    # it can be moved (Tetromino.move)
+    def move(self, direction):
+        if not self.can_be_moved(direction):
+            return False
+        if direction == "left":
+            self.current_piece.shift(-1, 0)
+        elif direction == "right":
+            self.current_piece.shift(1, 0)
+        else:
+            self.current_piece.shift(0, -1)
+        return True
+
+    # Method for dropping the current tetromino as far as it can go down
+    # (Tetromino.drop), the distance is found at once from the lowest tile of
+    # each column of its tile matrix
+    def drop(self):
+        piece, n = self.current_piece, self.current_piece.n
+        xs, ys = [], []
+        for col in range(n):
+            for row in range(n - 1, -1, -1):
+                if piece.cells[row][col]:
+                    xs.append(piece.xs[row][col])
+                    ys.append(piece.ys[row][col])
+                    break
+        distance = int(self.kernels.landing_distance(
+            self.board_array, np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64)))
+        if distance == -1:
+            raise EndlessDropError("the tetromino is below the grid and falls forever")
+        if distance:
+            piece.shift(0, -distance)
+
+    # Method for rotating the current tetromino if the rotated tetromino fits
+    # on the grid (Tetromino.rotateTetromino and canRotate)
+    def rotate(self, rot_dir):
+        piece, n = self.current_piece, self.current_piece.n
+        if piece.type == 'O':
+            piece.rotate_numbers(rot_dir)
+            return
+        piece.rotate(rot_dir)
+        s_or_z = piece.type == 'S' or piece.type == 'Z'
+        for row in range(n):
+            for col in range(n):
+                # the rest of a row is not checked after an empty cell
+                if not piece.cells[row][col]:
+                    break
+                x, y = piece.xs[row][col], piece.ys[row][col]
+                if (x < 0 or (x > self.grid_w - 1 and not s_or_z)
+                        or (s_or_z and x >= self.grid_w - 1) or y < 0
+                        or self.is_occupied(y, x)):
+                    piece.rotate(-rot_dir)
+                    return
+
+    # Method for placing the given tetromino on the board, then merging the
+    # tiles, clearing the full rows and dropping the floating tiles until the
+    # board does not change (GameGrid.resolve); it returns True when the game
+    # is over
+    def place(self, piece):
+        board, n, kernels = self.board_array, piece.n, self.kernels
+        for col in range(n):
+            for row in range(n):
+                if piece.cells[row][col]:
+                    x, y = piece.xs[row][col], piece.ys[row][col]
+                    if 0 <= y < self.grid_h and 0 <= x < self.grid_w:
+                        board[y, x] = piece.cells[row][col]
+                    else:
+                        self.over = True
+        border = min(piece.y + n, self.grid_h)
+        while True:
+            self.score_value += kernels.merge_tiles(board, border)
+            cleared_score = clear_rows(board, kernels.full_rows(board))
+            self.score_value += cleared_score
+            if not kernels.drop_floating_tiles(board) and not cleared_score:
+                return self.over
+
+    # Method for getting the exponents of the numbers of the tiles on the grid
+    # (0 for an empty cell)
+    def board(self):
+        return self.board_array
+
+    # Method for getting the score of the game
+    def score(self):
+        return self.score_value
+
+    # Method for checking if the game is over
+    def game_over(self):
+        return self.over
+
+    # Method for getting the current tetromino as a tuple of the x and y of its
+    # bottom left corner and (row, column, x, y, exponent) for each of its tiles
+    def piece(self):
+        return self.current_piece.state()
+
+    # Method for getting the types of the current and the next tetromino
+    def piece_types(self):
+        return self.current_piece.type, self.next_piece.type
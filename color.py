@@ -13,6 +13,8 @@ class Color:
     A Color object models an RGB color.
     """
 
+    __slots__ = ('_r', '_g', '_b')
+
     # -------------------------------------------------------------------
 
     def __init__(self, r=0, g=0, b=0):
@@ -50,6 +52,27 @@ class Color:
 
     # -------------------------------------------------------------------
 
+    def __eq__(self, other):
+        """
+        Return True if other is a Color with the same components as
+        self, and False otherwise.
+        """
+        if not isinstance(other, Color):
+            return NotImplemented
+        return (self._r == other._r) and (self._g == other._g) and \
+               (self._b == other._b)
+
+    # -------------------------------------------------------------------
+
+    def __hash__(self):
+        """
+        Return a hash of self computed from its components, so that
+        equal colors can share an entry in a dictionary.
+        """
+        return hash((self._r, self._g, self._b))
+
+    # -------------------------------------------------------------------
+
     def __str__(self):
         """
         Return the string equivalent of self, that is, a
@@ -0,0 +1,218 @@
+import argparse  # used for parsing the command line arguments
+import multiprocessing  # used for the worker processes and the barrier
+import random  # used for the actions of the random player
+import sys
+import time  # used for timing the pool
+from multiprocessing import shared_memory  # used for the boards shared with the workers
+
+import numpy as np  # fundamental Python module for scientific computing
+
+from board_engine import BoardEngine  # the engine on an exponent board
+from environment import ACTION_MODES, KEYS, Observation, PIECE_IDS, play_action, read_only_view
+
+# A pool of games played with the array engine by worker processes: the boards,
+# the scores, the rewards, the done flags, the piece ids and the actions of all
+# the games are arrays in a single shared memory block, and each worker plays
+# its own slice of the games in place. A step writes the actions into the block
+# and waits on a barrier twice (the workers start, the workers are done), so
+# nothing but the barrier crosses the process boundary in a step.
+
+# commands given to the workers through the header of the shared memory block
+RESET, STEP, CLOSE = 0, 1, 2
+
+
+# Function for getting the name, the type and the shape of each array stored in
+# the shared memory block for count games with the given dimensions of the
+# grid, the arrays are laid out one after the other in this order
+def shared_layout(count, grid_h, grid_w):
+    return (
+        # command for the workers and seed of the games (-1 for no seed)
+        ("header", np.int64, (2,)),
+        ("scores", np.int64, (count,)),
+        ("rewards", np.int64, (count,)),
+        ("actions", np.int64, (count,)),
+        ("pieces", np.int8, (count,)),
+        ("next_pieces", np.int8, (count,)),
+        ("dones", np.bool_, (count,)),
+        # whether the last step of each game ended it with an endless drop
+        ("endless", np.bool_, (count,)),
+        ("boards", np.uint8, (count, grid_h, grid_w)),
+    )
+
+
+# Function for getting the size (in bytes) an array with the given type and
+# shape takes in the block, each array starts at a multiple of 8 bytes
+def padded_size(dtype, shape):
+    return (np.dtype(dtype).itemsize * int(np.prod(shape)) + 7) // 8 * 8
+
+
+# Function for getting the size (in bytes) of the shared memory block for count
+# games with the given dimensions of the grid
+def shared_size(count, grid_h, grid_w):
+    return sum(padded_size(dtype, shape) for name, dtype, shape in shared_layout(count, grid_h, grid_w))
+
+
+# Function for getting the arrays stored in the given shared memory buffer for
+# count games with the given dimensions of the grid as a dictionary
+def shared_arrays(buffer, count, grid_h, grid_w):
+    arrays, offset = {}, 0
+    for name, dtype, shape in shared_layout(count, grid_h, grid_w):
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += padded_size(dtype, shape)
+    return arrays
+
+
+# Function run by each worker process: it plays the games from start to stop
+# (the indexes of the games in the shared arrays) each time the barrier is
+# passed, until the close command is given
+def worker(name, count, grid_h, grid_w, start, stop, action_mode, kernels, barrier):
+    block = shared_memory.SharedMemory(name=name)
+    arrays = shared_arrays(block.buf, count, grid_h, grid_w)
+    header, boards, scores, rewards = arrays["header"], arrays["boards"], arrays["scores"], arrays["rewards"]
+    actions, dones, endless = arrays["actions"], arrays["dones"], arrays["endless"]
+    pieces, next_pieces = arrays["pieces"], arrays["next_pieces"]
+    engines = {i: BoardEngine(grid_h, grid_w, kernels, boards[i]) for i in range(start, stop)}
+    # the seed of the next game of each game index: a game started again after
+    # the game i is over gets the seed of the game i plus count
+    seeds = {}
+    try:
+        while True:
+            barrier.wait()
+            command = int(header[0])
+            if command == CLOSE:
+                break
+            for i, engine in engines.items():
+                if command == RESET or dones[i]:
+                    if command == RESET:
+                        seeds[i] = None if header[1] < 0 else int(header[1]) + i
+                    engine.reset(seeds[i])
+                    if seeds[i] is not None:
+                        seeds[i] += count
+                    dones[i] = endless[i] = False
+                    rewards[i] = 0
+                if command == STEP:
+                    score = engine.score_value
+                    dones[i], endless[i] = play_action(engine, action_mode, int(actions[i]))
+                    rewards[i] = engine.score_value - score
+                scores[i] = engine.score_value
+                piece, next_piece = engine.piece_types()
+                pieces[i], next_pieces[i] = PIECE_IDS[piece], PIECE_IDS[next_piece]
+            barrier.wait()
+    except BaseException:
+        # the pool waiting on the barrier gets a BrokenBarrierError
+        barrier.abort()
+        raise
+    finally:
+        # the arrays must not use the block when it is closed
+        del header, boards, scores, rewards, actions, dones, endless, pieces, next_pieces, arrays
+        del engines
+        block.close()
+
+
+# Class used for playing count games at once on worker processes (see above),
+# it is stepped like environment.VectorEnv
+class EnvPool:
+    # Constructor that creates the shared memory block and starts the given
+    # number of workers (one for each CPU if it is None)
+    def __init__(self, count, grid_h=20, grid_w=12, action_mode="keys", workers=None, kernels=None):
+        self.count = count
+        self.grid_h, self.grid_w = grid_h, grid_w
+        self.action_mode = action_mode
+        self.action_count = len(KEYS) if action_mode == "keys" else 4 * grid_w
+        workers = min(workers or multiprocessing.cpu_count(), count)
+        self.block = shared_memory.SharedMemory(create=True, size=shared_size(count, grid_h, grid_w))
+        self.arrays = shared_arrays(self.block.buf, count, grid_h, grid_w)
+        self.observations = Observation(read_only_view(self.arrays["boards"]),
+                                        read_only_view(self.arrays["pieces"]),
+                                        read_only_view(self.arrays["next_pieces"]))
+        self.rewards = read_only_view(self.arrays["rewards"])
+        self.dones = read_only_view(self.arrays["dones"])
+        self.endless = read_only_view(self.arrays["endless"])
+        self.scores = read_only_view(self.arrays["scores"])
+        # the workers and the pool wait on the barrier before and after a step
+        self.barrier = multiprocessing.Barrier(workers + 1)
+        self.workers = []
+        for w in range(workers):
+            start, stop = count * w // workers, count * (w + 1) // workers
+            process = multiprocessing.Process(
+                target=worker, daemon=True,
+                args=(self.block.name, count, grid_h, grid_w, start, stop, action_mode, kernels,
+                      self.barrier))
+            process.start()
+            self.workers.append(process)
+
+    # Method for giving the given command to the workers and waiting until
+    # they are done
+    def run(self, command):
+        self.arrays["header"][0] = command
+        self.barrier.wait()
+        if command != CLOSE:
+            self.barrier.wait()
+
+    # Method for starting new games (it must be called before the first step),
+    # the game i is seeded with seed + i and the games started later at its
+    # index with seed + i + count, seed + i + 2 * count, ...; it returns the
+    # observations
+    def reset(self, seed=None):
+        self.arrays["header"][1] = -1 if seed is None else seed
+        self.run(RESET)
+        return self.observations
+
+    # Method for playing the given actions (one for each game), it returns the
+    # observations, the rewards and whether each game was over (the games that
+    # were over are started again by the next step), the games ended by an
+    # endless drop are flagged in the endless array
+    def step(self, actions):
+        self.arrays["actions"][:] = actions
+        self.run(STEP)
+        return self.observations, self.rewards, self.dones
+
+    # Method for stopping the workers and freeing the shared memory block
+    def close(self):
+        if self.block is None:
+            return
+        self.run(CLOSE)
+        for process in self.workers:
+            process.join()
+        self.arrays = self.observations = self.rewards = self.dones = self.endless = None
+        self.scores = None
+        self.block.close()
+        self.block.unlink()
+        self.block = None
+
+
+# Plays random actions in pools with 1, 2, 4, ... workers (up to the number of
+# CPUs) and reports the steps per second:
+#   python env_pool.py [--count 256] [--steps 100] [--actions keys]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plays random actions in pools of worker processes")
+    parser.add_argument("--actions", choices=ACTION_MODES, default="keys")
+    parser.add_argument("--count", type=int, default=256, help="number of games of the pool")
+    parser.add_argument("--steps", type=int, default=100, help="number of steps of the pool")
+    parser.add_argument("--height", type=int, default=20, help="number of rows of the grid")
+    parser.add_argument("--width", type=int, default=12, help="number of columns of the grid")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="largest number of workers")
+    args = parser.parse_args(argv)
+    player = random.Random(0)
+    workers = 1
+    while True:
+        pool = EnvPool(args.count, args.height, args.width, args.actions, workers)
+        try:
+            pool.reset(0)
+            # the first step compiles the kernels if they are compiled on first use
+            pool.step(np.zeros(args.count, dtype=np.int64))
+            started = time.perf_counter()
+            for i in range(args.steps):
+                pool.step(np.array([player.randrange(pool.action_count) for j in range(args.count)]))
+            seconds = time.perf_counter() - started
+        finally:
+            pool.close()
+        print("%d workers: %d steps/s" % (workers, args.steps * args.count / seconds))
+        if workers >= args.workers:
+            return 0
+        workers = min(workers * 2, args.workers)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
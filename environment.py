@@ -0,0 +1,239 @@
+import argparse  # used for parsing the command line arguments
+import collections  # used for the observations
+import random  # used for the actions of the random player
+import sys
+import time  # used for timing the environments
+
+import numpy as np  # fundamental Python module for scientific computing
+
+from board_engine import BoardEngine, EndlessDropError, TYPES  # the engine on an exponent board
+from headless_game import HeadlessGame, KEYS  # the engine of the legacy rules
+
+# Environments for playing the game from a program (e.g. for reinforcement
+# learning) instead of from the keyboard: reset(seed) starts a new game and
+# step(action) plays an action and returns the observation of the game, the
+# reward (the increase of the score) and whether the game is over.
+#
+# An action is either a key (the index of a key in headless_game.KEYS, a step
+# of the game loop) or a placement (rotation * grid_w + column: the current
+# tetromino is rotated clockwise rotation times, moved until its leftmost tile
+# is in the given column and dropped, and the game is stepped until it lands).
+#
+# The board of an observation is a read-only view of the exponents of the
+# numbers of the tiles on the game grid (0 for an empty cell, see
+# GameGrid.exponent_matrix): it shows the board of the game as it is played
+# and is not copied at each step.
+
+# engines an environment can play the game with, each one is created with the
+# dimensions of the grid and has the methods of HeadlessGame
+ENGINES = {
+    "legacy": HeadlessGame,
+    "array": BoardEngine,
+}
+# kinds of actions an environment can be stepped with
+ACTION_MODES = ("keys", "placements")
+# id of each type of tetromino in the observations
+PIECE_IDS = {type: index for index, type in enumerate(TYPES)}
+
+# Observation of a game: the read-only board view and the ids of the types of
+# the current and the next tetromino
+Observation = collections.namedtuple("Observation", ["board", "piece", "next_piece"])
+
+
+# Function for getting a read-only view of the given array
+def read_only_view(array):
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+# Function for playing the given placement (see above) with the given engine,
+# it returns True when the game is over
+def play_placement(engine, rotation, column):
+    piece_count = engine.piece_count
+    keys = ["d"] * rotation
+    while True:
+        if keys:
+            key = keys.pop()
+        else:
+            # x of the leftmost tile of the current tetromino
+            leftmost = min(tile[2] for tile in engine.piece()[2:])
+            if leftmost > column:
+                key = "left"
+            elif leftmost < column:
+                key = "right"
+            else:
+                key = "space"
+        corner_x = engine.piece()[0]
+        if engine.step(key):
+            return True
+        # the tetromino is placed
+        if engine.piece_count != piece_count:
+            return False
+        # the tetromino cannot be moved to the column, it is dropped where it is
+        if key in ("left", "right") and engine.piece()[0] == corner_x:
+            column = leftmost
+
+
+# Function for playing the given action (see above) of the given kind with the
+# given engine, it returns whether the game is over and whether it was ended
+# because the tetromino would fall forever if it was dropped (both engines
+# raise EndlessDropError instead of making such a drop)
+def play_action(engine, action_mode, action):
+    try:
+        if action_mode == "keys":
+            return engine.step(KEYS[action]), False
+        return play_placement(engine, action // engine.grid_w, action % engine.grid_w), False
+    except EndlessDropError:
+        return True, True
+
+
+# Class used for playing a game as an environment with the given engine (a
+# name in ENGINES) and kind of actions (one of ACTION_MODES)
+class TetrisEnv:
+    # Constructor that creates an environment with the given dimensions of the
+    # grid
+    def __init__(self, grid_h=20, grid_w=12, engine="array", action_mode="keys"):
+        self.grid_h, self.grid_w = grid_h, grid_w
+        self.engine = ENGINES[engine](grid_h, grid_w)
+        self.action_mode = action_mode
+        # number of the actions
+        self.action_count = len(KEYS) if action_mode == "keys" else 4 * grid_w
+        self.board_view = None
+        self.done = True
+
+    # Method for starting a new game seeded with the given seed, it returns
+    # the first observation
+    def reset(self, seed=None):
+        self.engine.reset(seed)
+        # the legacy engine creates a new game grid for each game
+        self.board_view = read_only_view(self.engine.board())
+        self.done = False
+        return self.observation()
+
+    # Method for playing the given action, it returns the observation, the
+    # reward, whether the game is over and a dictionary of information
+    def step(self, action):
+        if self.done:
+            raise RuntimeError("the game is over, reset must be called first")
+        score = self.engine.score()
+        self.done, endless = play_action(self.engine, self.action_mode, action)
+        info = {"pieces": self.engine.piece_count}
+        if endless:
+            # the legacy rules would never return from the drop
+            info["endless"] = True
+        return self.observation(), self.engine.score() - score, self.done, info
+
+    # Method for getting the observation of the game
+    def observation(self):
+        piece, next_piece = self.engine.piece_types()
+        return Observation(self.board_view, PIECE_IDS[piece], PIECE_IDS[next_piece])
+
+
+# Class used for playing many games at once with the array engine: the boards
+# of the games are the parts of a single (count, grid_h, grid_w) array, and the
+# observations are a read-only view of it and arrays of the piece ids. A game
+# that is over is started again by the next step
+class VectorEnv:
+    # Constructor that creates count environments with the given dimensions of
+    # the grid
+    def __init__(self, count, grid_h=20, grid_w=12, action_mode="keys", kernels=None):
+        self.count = count
+        self.grid_h, self.grid_w = grid_h, grid_w
+        self.action_mode = action_mode
+        self.action_count = len(KEYS) if action_mode == "keys" else 4 * grid_w
+        self.boards = np.zeros((count, grid_h, grid_w), dtype=np.uint8)
+        self.engines = [BoardEngine(grid_h, grid_w, kernels, self.boards[i]) for i in range(count)]
+        self.pieces = np.zeros(count, dtype=np.int8)
+        self.next_pieces = np.zeros(count, dtype=np.int8)
+        self.rewards = np.zeros(count, dtype=np.int64)
+        self.dones = np.zeros(count, dtype=bool)
+        # whether the last step of each game ended it with a drop that the
+        # legacy rules would never return from (see TetrisEnv.step)
+        self.endless = np.zeros(count, dtype=bool)
+        self.observations = Observation(read_only_view(self.boards), read_only_view(self.pieces),
+                                        read_only_view(self.next_pieces))
+        # seed of the next game of each game index
+        self.seeds = [None] * count
+
+    # Method for starting new games, the game i is seeded with seed + i and the
+    # games started later at its index with seed + i + count, seed + i + 2 *
+    # count, ...; it returns the observations
+    def reset(self, seed=None):
+        for i, engine in enumerate(self.engines):
+            self.seeds[i] = None if seed is None else seed + i
+            self.start_game(i)
+        self.dones[:] = False
+        self.endless[:] = False
+        return self.observations
+
+    # Method for starting the next game at the index i
+    def start_game(self, i):
+        self.engines[i].reset(self.seeds[i])
+        if self.seeds[i] is not None:
+            self.seeds[i] += self.count
+        self.update_pieces(i)
+
+    # Method for playing the given actions (one for each game), it returns the
+    # observations, the rewards and whether each game was over (the games that
+    # were over are started again), the games ended by an endless drop are
+    # flagged in the endless array
+    def step(self, actions):
+        for i, engine in enumerate(self.engines):
+            if self.dones[i]:
+                self.start_game(i)
+            score = engine.score_value
+            self.dones[i], self.endless[i] = play_action(engine, self.action_mode, int(actions[i]))
+            self.rewards[i] = engine.score_value - score
+            self.update_pieces(i)
+        return self.observations, self.rewards, self.dones
+
+    # Method for updating the piece ids of the game i
+    def update_pieces(self, i):
+        piece, next_piece = self.engines[i].piece_types()
+        self.pieces[i] = PIECE_IDS[piece]
+        self.next_pieces[i] = PIECE_IDS[next_piece]
+
+
+# Plays random actions in an environment and in a vector environment and
+# reports the steps per second:
+#   python environment.py [--engine array] [--actions keys] [--count 64]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plays random actions in the environments")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="array")
+    parser.add_argument("--actions", choices=ACTION_MODES, default="keys")
+    parser.add_argument("--count", type=int, default=64, help="number of games of the vector environment")
+    parser.add_argument("--steps", type=int, default=20000, help="number of steps of each environment")
+    parser.add_argument("--height", type=int, default=20, help="number of rows of the grid")
+    parser.add_argument("--width", type=int, default=12, help="number of columns of the grid")
+    args = parser.parse_args(argv)
+    player = random.Random(0)
+
+    env = TetrisEnv(args.height, args.width, args.engine, args.actions)
+    env.reset(0)
+    games, total_reward = 1, 0
+    started = time.perf_counter()
+    for i in range(args.steps):
+        observation, reward, done, info = env.step(player.randrange(env.action_count))
+        total_reward += reward
+        if done:
+            env.reset(games)
+            games += 1
+    seconds = time.perf_counter() - started
+    print("env (%s): %d steps/s, %d games, %.1f reward/game" % (
+        args.engine, args.steps / seconds, games, total_reward / games))
+
+    vector_env = VectorEnv(args.count, args.height, args.width, args.actions)
+    vector_env.reset(0)
+    steps = max(args.steps // args.count, 1)
+    started = time.perf_counter()
+    for i in range(steps):
+        vector_env.step(np.array([player.randrange(vector_env.action_count)
+                                  for j in range(args.count)]))
+    seconds = time.perf_counter() - started
+    print("vector env (%d games): %d steps/s" % (args.count, steps * args.count / seconds))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
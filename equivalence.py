@@ -0,0 +1,122 @@
+import argparse  # used for parsing the command line arguments
+import functools  # used for the engines with each set of kernels
+import random  # used for the keys of the scripted player
+import sys
+import time  # used for timing the engines
+
+import numpy as np  # fundamental Python module for scientific computing
+
+from board_engine import BoardEngine, EndlessDropError, KERNELS  # the engine on an exponent board
+from headless_game import HeadlessGame, KEYS  # the engine of the legacy rules
+
+# engines that can be compared from the command line, each one is created with
+# the dimensions of the grid and has the reset, step, board, score, game_over
+# and piece methods of HeadlessGame; "array" uses the default set of kernels
+ENGINES = {
+    "legacy": HeadlessGame,
+    "array": BoardEngine,
+}
+for name in KERNELS:
+    ENGINES["array-" + name] = functools.partial(BoardEngine, kernels=name)
+
+
+# Function for describing how two states of a game differ
+def describe_difference(a, b):
+    differences = []
+    if not np.array_equal(a.board(), b.board()):
+        rows, cols = np.nonzero(a.board() != b.board())
+        cells = ", ".join("(%d, %d): %d != %d" % (row, col, a.board()[row, col], b.board()[row, col])
+                          for row, col in zip(rows.tolist()[:5], cols.tolist()[:5]))
+        differences.append("board %s" % cells)
+    if a.score() != b.score():
+        differences.append("score %d != %d" % (a.score(), b.score()))
+    if a.game_over() != b.game_over():
+        differences.append("game over %s != %s" % (a.game_over(), b.game_over()))
+    # the tiles of a tetromino that ends the game are placed on the grid and
+    # may be changed by the merges, so the tetrominoes are compared only while
+    # the game goes on
+    if not a.game_over() and a.piece() != b.piece():
+        differences.append("piece %s != %s" % (a.piece(), b.piece()))
+    return "; ".join(differences)
+
+
+# Function for playing the same seeded game with two engines in lockstep, the
+# keys are chosen by a player seeded with the same seed; after each step the
+# boards, the scores, the game over states and the current tetrominoes are
+# compared. It returns a dictionary with the number of steps played, the time
+# spent in each engine and the first difference found (None if there is none).
+# The candidate makes each step first: when it finds that the legacy rules
+# would never return from the step (see EndlessDropError), the game is ended
+# without making the step with the reference
+def compare_game(reference, candidate, seed, max_steps):
+    player = random.Random(seed)
+    reference_time = candidate_time = 0.0
+    started = time.perf_counter()
+    reference.reset(seed)
+    reference_time += time.perf_counter() - started
+    started = time.perf_counter()
+    candidate.reset(seed)
+    candidate_time += time.perf_counter() - started
+    difference = describe_difference(reference, candidate)
+    steps = 0
+    endless = False
+    while not difference and steps < max_steps:
+        key = player.choice(KEYS)
+        started = time.perf_counter()
+        try:
+            candidate_over = candidate.step(key)
+        except EndlessDropError:
+            endless = True
+            break
+        candidate_time += time.perf_counter() - started
+        started = time.perf_counter()
+        reference_over = reference.step(key)
+        reference_time += time.perf_counter() - started
+        steps += 1
+        difference = describe_difference(reference, candidate)
+        if not difference and reference_over != candidate_over:
+            difference = "step result %s != %s" % (reference_over, candidate_over)
+        if reference_over:
+            break
+    return {"seed": seed, "steps": steps, "score": reference.score(), "endless": endless,
+            "reference_time": reference_time, "candidate_time": candidate_time,
+            "difference": "step %d, key %s: %s" % (steps, key, difference) if difference else None}
+
+
+# Compares an engine with the legacy rules on seeded random games and reports
+# the first difference in each game and the speedup of the engine:
+#   python equivalence.py [--games 20] [--steps 5000] [--height 20] [--width 12]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checks that an engine plays like the legacy rules")
+    parser.add_argument("--reference", choices=sorted(ENGINES), default="legacy")
+    parser.add_argument("--candidate", choices=sorted(ENGINES), default="array")
+    parser.add_argument("--games", type=int, default=20, help="number of games (seeds 0, 1, ...)")
+    parser.add_argument("--steps", type=int, default=5000, help="maximum number of steps of a game")
+    parser.add_argument("--height", type=int, default=20, help="number of rows of the grid")
+    parser.add_argument("--width", type=int, default=12, help="number of columns of the grid")
+    args = parser.parse_args(argv)
+    reference = ENGINES[args.reference](args.height, args.width)
+    candidate = ENGINES[args.candidate](args.height, args.width)
+    reference_time = candidate_time = 0.0
+    total_steps = failures = 0
+    for seed in range(args.games):
+        result = compare_game(reference, candidate, seed, args.steps)
+        reference_time += result["reference_time"]
+        candidate_time += result["candidate_time"]
+        total_steps += result["steps"]
+        status = "ok" if result["difference"] is None else "DIFFERENT at " + result["difference"]
+        if result["endless"]:
+            status += " (ended where the legacy drop never returns)"
+        print("seed %d: %d steps, score %d, %s" % (seed, result["steps"], result["score"], status))
+        if result["difference"] is not None:
+            failures += 1
+    print("%d of %d games identical, %d steps" % (args.games - failures, args.games, total_steps))
+    print("%s: %.1f us/step, %s: %.1f us/step, speedup x%.2f" % (
+        args.reference, reference_time / max(total_steps, 1) * 1e6,
+        args.candidate, candidate_time / max(total_steps, 1) * 1e6,
+        reference_time / max(candidate_time, 1e-9)))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import argparse  # used for parsing the command line arguments
+import collections  # used for the features
+import sys
+import time  # used for timing the features
+
+import numpy as np  # fundamental Python module for scientific computing
+
+# Features of boards used by bots for evaluating the candidate placements of a
+# tetromino. The boards are exponent boards as GameGrid.exponent_matrix: the
+# row index is the y of the cell (row 0 is the bottom of the game grid, as in
+# GameGrid.tile_matrix), and a cell holds k for the number 2 ** k and 0 when it
+# is empty. All the features of a stack of K boards are found at once with
+# NumPy operations on the whole (K, grid_h, grid_w) stack.
+
+# Features of a stack of boards, each field is an array with a value for each
+# board:
+#   aggregate_height   sum of the heights of the columns (the height of a
+#                      column is one more than the row of its highest tile)
+#   max_height         height of the highest column
+#   holes              empty cells below the highest tile of their column
+#   bumpiness          sum of the height differences of the adjacent columns
+#   vertical_pairs     tiles with the same number as the tile below them (the
+#                      tiles that merge, see GameGrid.merge)
+#   horizontal_pairs   tiles with the same number as the tile on their right
+#   max_exponent       exponent of the largest number on the board (0 if empty)
+#   max_row, max_col   row and column of the largest number (the lowest and
+#                      then the leftmost one if there are several)
+#   full_rows          rows without an empty cell (cleared by clearLines)
+#   near_full_rows     rows with at least one and at most near empty cells
+Features = collections.namedtuple("Features", [
+    "aggregate_height", "max_height", "holes", "bumpiness", "vertical_pairs",
+    "horizontal_pairs", "max_exponent", "max_row", "max_col", "full_rows", "near_full_rows"])
+
+
+# Function for computing the features of the given stack of boards (a single
+# board can also be given), near is the largest number of empty cells of a
+# row counted by near_full_rows
+def board_features(boards, near=2):
+    boards = np.asarray(boards)
+    if boards.ndim == 2:
+        boards = boards[np.newaxis]
+    count, grid_h, grid_w = boards.shape
+    occupied = boards != 0
+    # height of each column: the first occupied cell from the top gives the row
+    # of the highest tile, the columns without a tile have the height 0
+    from_top = np.argmax(occupied[:, ::-1, :], axis=1)
+    heights = np.where(occupied.any(axis=1), grid_h - from_top, 0)
+    aggregate_height = heights.sum(axis=1)
+    # the cells below the height of a column are either tiles or holes
+    holes = aggregate_height - occupied.sum(axis=(1, 2))
+    bumpiness = np.abs(np.diff(heights, axis=1)).sum(axis=1)
+    vertical_pairs = (occupied[:, 1:, :] & (boards[:, 1:, :] == boards[:, :-1, :])).sum(axis=(1, 2))
+    horizontal_pairs = (occupied[:, :, 1:] & (boards[:, :, 1:] == boards[:, :, :-1])).sum(axis=(1, 2))
+    # the largest number and its position (argmax gives the first one in the
+    # row-major order, that is the lowest row and then the leftmost column)
+    flat = boards.reshape(count, grid_h * grid_w)
+    max_index = np.argmax(flat, axis=1)
+    max_exponent = flat[np.arange(count), max_index]
+    max_row, max_col = np.divmod(max_index, grid_w)
+    empty_cells = grid_w - occupied.sum(axis=2)
+    full_rows = (empty_cells == 0).sum(axis=1)
+    near_full_rows = ((empty_cells > 0) & (empty_cells <= near)).sum(axis=1)
+    return Features(aggregate_height, heights.max(axis=1), holes, bumpiness, vertical_pairs,
+                    horizontal_pairs, max_exponent, max_row, max_col, full_rows, near_full_rows)
+
+
+# Function for getting the given features as a (K, number of features) array
+# of floats (e.g. the inputs of a model), the columns are in the order of the
+# fields of Features
+def feature_matrix(features):
+    return np.stack([np.asarray(value, dtype=np.float64) for value in features], axis=1)
+
+
+# Function for computing the features of a single board one cell at a time,
+# used for checking board_features
+def board_features_slow(board, near=2):
+    grid_h, grid_w = board.shape
+    heights = []
+    for col in range(grid_w):
+        rows = [row for row in range(grid_h) if board[row][col] != 0]
+        heights.append(max(rows) + 1 if rows else 0)
+    tiles = sum(1 for row in range(grid_h) for col in range(grid_w) if board[row][col] != 0)
+    max_exponent, max_row, max_col = 0, 0, 0
+    for row in range(grid_h):
+        for col in range(grid_w):
+            if board[row][col] > max_exponent:
+                max_exponent, max_row, max_col = board[row][col], row, col
+    empty_cells = [sum(1 for col in range(grid_w) if board[row][col] == 0) for row in range(grid_h)]
+    return Features(
+        sum(heights), max(heights), sum(heights) - tiles,
+        sum(abs(heights[col] - heights[col + 1]) for col in range(grid_w - 1)),
+        sum(1 for row in range(1, grid_h) for col in range(grid_w)
+            if board[row][col] != 0 and board[row][col] == board[row - 1][col]),
+        sum(1 for row in range(grid_h) for col in range(1, grid_w)
+            if board[row][col] != 0 and board[row][col] == board[row][col - 1]),
+        max_exponent, max_row, max_col,
+        sum(1 for empty in empty_cells if empty == 0),
+        sum(1 for empty in empty_cells if 0 < empty <= near))
+
+
+# Function for creating a stack of count random boards with the given
+# dimensions: stacked tiles in each column with a few holes
+def random_boards(count, grid_h, grid_w, seed=0):
+    rng = np.random.default_rng(seed)
+    heights = rng.integers(0, grid_h + 1, size=(count, 1, grid_w))
+    rows = np.arange(grid_h).reshape(1, grid_h, 1)
+    exponents = rng.integers(1, 12, size=(count, grid_h, grid_w), dtype=np.uint8)
+    holes = rng.random((count, grid_h, grid_w)) < 0.1
+    return np.where((rows < heights) & ~holes, exponents, 0).astype(np.uint8)
+
+
+# Checks board_features against the cell by cell features on random boards and
+# reports the time per board:
+#   python features.py [--count 512] [--height 20] [--width 12]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checks and times the board features")
+    parser.add_argument("--count", type=int, default=512, help="number of boards in the stack")
+    parser.add_argument("--height", type=int, default=20, help="number of rows of the grid")
+    parser.add_argument("--width", type=int, default=12, help="number of columns of the grid")
+    args = parser.parse_args(argv)
+    boards = random_boards(args.count, args.height, args.width)
+    started = time.perf_counter()
+    features = board_features(boards)
+    seconds = time.perf_counter() - started
+    failures = 0
+    for k in range(min(args.count, 100)):
+        expected = board_features_slow(boards[k])
+        actual = tuple(int(value[k]) for value in features)
+        if actual != tuple(int(value) for value in expected):
+            print("board %d: %s != %s" % (k, actual, expected))
+            failures += 1
+    print("%d boards: %.2f us/board" % (args.count, seconds / args.count * 1e6))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
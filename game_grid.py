@@ -1,27 +1,56 @@
 import numpy as np  # fundamental Python module for scientific computing
+import bisect  # used for keeping the columns to check in order
+import collections  # used for the snapshots of the game grid
 import copy
 import os
-from picture import Picture  # used representing images to display
+import picture  # used for loading the images to display
 import stddraw  # the stddraw module is used as a basic graphics library
 from color import Color  # used for coloring the game grid
+# used for drawing the tiles placed on the game grid and for their colors
+from tile import Tile, BACKGROUND_COLORS, DARK_NUMBER_COLOR, LIGHT_NUMBER_COLOR
 
+# path of the image file of the pause icon
+PAUSE_IMAGE = os.path.dirname(os.path.realpath(__file__)) + "/pause.png"
 
-def draw_pause():  # draws the pause icon when paused
-    current_dir = os.path.dirname(os.path.realpath(__file__))
-    # path of the image file
-    img_file = current_dir + "/pause.png"
-    # center coordinates to display the image
-    img_center_x, img_center_y = 7.5, 10
-    # image is represented using the Picture class
-    image_to_display = Picture(img_file)
+# Immutable copy of everything needed for drawing the game grid at a moment:
+# the states (see Tile.state) of the placed tiles, or a read-only copy of the
+# exponent matrix in "raster" mode, the states of the tiles of the current and
+# the next tetromino, the score and the pause flag
+GridSnapshot = collections.namedtuple(
+    "GridSnapshot", ["tiles", "exponents", "piece", "next_piece", "score", "pause"])
+# Change made on the game grid while it is resolved (see GameGrid.resolve): in
+# the given step of the chain, the tile with the given number in the given row
+# and column is merged with the tile below it ("merge") or dropped ("drop"),
+# or the given row is cleared ("clear", the number is the score of the row and
+# the column is None)
+CascadeEvent = collections.namedtuple("CascadeEvent", ["step", "kind", "row", "col", "number"])
+
+
+# Function for getting the font size of the texts on the information grid of a
+# game grid with the given width and cell size (in pixels), it is 24 for the
+# 12 column game grid with 40 pixel cells
+def information_font_size(grid_w, cell_size):
+    return max(1, round(grid_w * cell_size / 20))
+
+
+def draw_pause(img_center_x, img_center_y):  # draws the pause icon when paused
+    # the image is read from the disk only once
+    image_to_display = picture.load(PAUSE_IMAGE)
     # display the image
     stddraw.picture(image_to_display, img_center_x, img_center_y)
 
 
 # Class used for modelling the game grid
 class GameGrid:
+    # render modes of the game grid: "tiles" draws each tile with its box and
+    # number, "raster" writes the colors of all the cells directly into the
+    # pixels of the canvas and suits large game grids
+    RENDER_MODES = ("tiles", "raster")
+    # smallest cell size (in pixels) for showing the numbers in "raster" mode
+    raster_number_min_size = 16
+
     # Constructor for creating the game grid based on the given arguments
-    def __init__(self, grid_h, grid_w, full_grid_h, full_grid_w):
+    def __init__(self, grid_h, grid_w, full_grid_h, full_grid_w, cell_size=40):
         self.score = 0
         # set the dimensions of the game grid as the given arguments
         self.grid_height = grid_h
@@ -30,6 +59,22 @@ class GameGrid:
         self.full_grid_width = full_grid_w
         # create the tile matrix to store the tiles placed on the game grid
         self.tile_matrix = np.full((grid_h, grid_w), None)
+        # exponents of the numbers of the tiles in tile_matrix (0 for an empty
+        # cell), it is kept in step with tile_matrix by the set_tile method
+        self.exponent_matrix = np.zeros((grid_h, grid_w), dtype=np.uint8)
+        # columns changed by the set_tile method since the game grid was last
+        # resolved; the tiles of the other columns can neither be merged nor
+        # dropped, so remove_gaps checks these columns only
+        self.dirty_columns = set()
+        # (row, column) of the cells changed by the set_tile method since the
+        # last merge, only the tiles next to them can be merged
+        self.dirty_cells = set()
+        # number of the tiles dropped by one row (see drop_tile)
+        self.drop_count = 0
+        # size of each grid cell on the canvas (in pixels)
+        self.cell_size = cell_size
+        # the way the tiles on the game grid are drawn (one of RENDER_MODES)
+        self.render_mode = "tiles"
         # the tetromino that is currently being moved on the game grid
         self.current_tetromino = None
         # next tetromino
@@ -46,30 +91,112 @@ class GameGrid:
         # thickness values used for the grid lines and the grid boundaries
         self.line_thickness = 0.0045
         self.box_thickness = self.line_thickness
+        # cell colors used in "raster" mode indexed by the exponents in
+        # exponent_matrix, 0 is used for the empty cells
+        last = len(BACKGROUND_COLORS) - 1
+        self.raster_palette = [self.empty_cell_color] + \
+                              [BACKGROUND_COLORS[min(e, last)] for e in range(1, 256)]
+        # canvas layers cached between frames: the background that never
+        # changes during a game (grid lines, boundaries and the information
+        # grid) and the background with the score and the next tetromino on it
+        self.background_layer = None
+        self.information_layer = None
+        # score and next tetromino that the information layer was drawn for
+        self.information_key = None
+        # render thread that draws the published snapshots of the game grid, the
+        # game grid is drawn by the display method itself when it is None
+        self.renderer = None
+        # a headless game grid is never displayed (used for running games
+        # without a window, e.g. for testing and benchmarking the game rules)
+        self.headless = False
+        # snapshots of the frames of the animation of the merges, the clears and
+        # the drops recorded by display, for playing them later with waits that
+        # do not block the event loop (see Tetris_2048.play_animation); None for
+        # drawing each frame and waiting in display
+        self.animation = None
 
-    # Method used for displaying the game grid
+    # Method used for displaying the game grid and waiting for speed ms, or
+    # recording the frame if the animation is recorded
     def display(self):
-        # clear the background canvas to empty_cell_color
-        stddraw.clear(self.empty_cell_color)
-        # draw the game grid
-        self.draw_grid()
+        if self.headless:
+            return
+        if self.animation is not None:
+            self.animation.append(self.snapshot())
+            return
+        self.present_frame()
+        # with a render thread, slow drawing does not delay the game as the
+        # snapshot is drawn while the game waits
+        stddraw.wait(self.speed)
+
+    # Method for displaying the game grid (or the given snapshot of it) without
+    # waiting, the snapshot is published to the render thread if there is one
+    def present_frame(self, snapshot=None):
+        if snapshot is None:
+            snapshot = self.snapshot()
+        if self.renderer is not None:
+            self.renderer.publish(snapshot)
+        else:
+            self.render(snapshot)
+            stddraw.present()
+
+    # Method for taking a snapshot of the game grid for drawing it later
+    def snapshot(self):
+        if self.render_mode == "raster":
+            tiles = None
+            exponents = self.exponent_matrix.copy()
+            exponents.flags.writeable = False
+        else:
+            tiles = tuple(tile.state() for tile in self.tile_matrix.flat if tile is not None)
+            exponents = None
+        piece = () if self.current_tetromino is None else self.current_tetromino.tile_states()
+        next_piece = () if self.next_tetromino is None else self.next_tetromino.tile_states()
+        return GridSnapshot(tiles, exponents, piece, next_piece, self.score, self.pause)
+
+    # Method for drawing the given snapshot of the game grid on the canvas
+    def render(self, snapshot):
+        # start from the cached background with the score and next tetromino
+        stddraw.restore(self.get_information_layer(snapshot))
+        # draw the tiles on the game grid
+        if snapshot.exponents is not None:
+            self.draw_grid_raster(snapshot.exponents)
+        else:
+            Tile.draw_states(snapshot.tiles)
         # draw the current (active) tetromino
-        if self.current_tetromino is not None:
-            self.current_tetromino.draw()
-        # draw a box around the game grid
-        self.draw_boundaries()
-        # draw the second grid for showing score and next tetromino
-        self.draw_information_grid()
-        if self.pause:
-            draw_pause()
-        # show the resulting drawing with a pause duration = speed
-        stddraw.show(self.speed)
-
-    # method for clearing full lines
-    def clearLines(self):
+        Tile.draw_states(snapshot.piece)
+        if snapshot.pause:
+            # the icon is centered on the game grid and the information grid
+            draw_pause((self.full_grid_width - 1) / 2, self.grid_height / 2)
+
+    # Method for resolving the game grid after a tetromino is placed on it: the
+    # tiles are merged, the full lines are cleared and the floating tiles are
+    # dropped, and this is repeated until the game grid does not change. It
+    # returns the depth of the chain (the number of steps that changed the game
+    # grid) and the list of the CascadeEvents of all the steps
+    def resolve(self):
+        events = []
+        depth = 0
+        while True:
+            count = len(events)
+            self.merge(events, depth)
+            merged = len(events) > count
+            cleared = self.clearLines(events, depth)
+            dropped = self.remove_gaps(events, depth)
+            if merged or cleared or dropped:
+                depth += 1
+            # merge is repeated until no tiles can be merged, so the game grid
+            # does not change anymore if no line is cleared and no tile drops
+            if not (cleared or dropped):
+                self.dirty_columns.clear()
+                return depth, events
+
+    # method for clearing full lines, the cleared lines are added to the given
+    # list of events (if any) for the given step; it returns True if a line is
+    # cleared
+    def clearLines(self, events=None, step=0):
         col = len(self.tile_matrix[0])
         row = len(self.tile_matrix)
         score = 0
+        cleared = False
         for r in range(row):
             row_full = True
             for c in range(col):
@@ -78,19 +205,24 @@ class GameGrid:
                     break
             if row_full:  # if there is no None in that row
                 for i in range(col):
-                    self.tile_matrix[r][i].background_color = Color(0, 255, 0)
-                    self.tile_matrix[r][i].foreground_color = Color(255, 255, 255)
+                    self.tile_matrix[r][i].highlight()
                 self.display()
+                cleared = True
+                if events is not None:
+                    row_score = sum(self.tile_matrix[r][c].number for c in range(col))
+                    events.append(CascadeEvent(step, "clear", r, None, row_score))
                 for c in range(col):
                     score += self.tile_matrix[r][c].number  # sum up values for the score
-                    self.tile_matrix[r][c] = None  # remove those tiles
+                    self.tile_matrix[r][c].release()  # used again for a new tetromino
+                    self.set_tile(r, c, None)  # remove those tiles
                     # drop the upper tiles
                     for i in range(r, row - 1):
                         if self.tile_matrix[i + 1][c] is not None:
                             self.tile_matrix[i + 1][c].move(0, -1)
-                            self.tile_matrix[i][c] = self.tile_matrix[i + 1][c]
-                            self.tile_matrix[i + 1][c] = None
+                            self.set_tile(i, c, self.tile_matrix[i + 1][c])
+                            self.set_tile(i + 1, c, None)
         self.score += score  # update score
+        return cleared
 
     # method for updating grid colors after each merge
     def updateGridColor(self):
@@ -101,70 +233,136 @@ class GameGrid:
                 if self.tile_matrix[r][c] is not None:
                     self.tile_matrix[r][c].updateTileColor()
 
-    # Method for merging the back to back tiles with same numbers
-    def merge(self):
-        # recursion check variable
-        merged = False
+    # Method for merging the back to back tiles with same numbers, the merges
+    # are added to the given list of events (if any) for the given step.
+    # The merges are made in the order of the passes of the original game: a
+    # pass goes over the rows from the bottom and makes at most one merge in
+    # each row (in the leftmost column where the tile on the row and the tile
+    # below it can be merged), and the passes are repeated until no tiles are
+    # merged; the resulting numbers depend on this order. Instead of going
+    # over all the rows in each pass, the pairs of tiles that can be merged are
+    # kept in a worklist ordered by (pass, row, column): it starts with the
+    # pairs next to the cells changed since the last merge (the other tiles
+    # were already checked), and a merge adds the pairs of the cells it changes
+    # to the current pass if they are above its row and to the next pass if
+    # the pass has left them. The work is linear in the number of changed tiles
+    def merge(self, events=None, step=0):
         # determine the merge height border
         if self.current_tetromino.bottom_left_corner.y + self.current_tetromino.n > len(self.tile_matrix):
             up_merge_border = len(self.tile_matrix)
         else:
             up_merge_border = self.current_tetromino.bottom_left_corner.y + self.current_tetromino.n
-        # check in tetrominoes height border
-        for col in range(1, len(self.tile_matrix)):
-            # check in tetrominoes width border
-            for row in range(len(self.tile_matrix[0])):
-                # check if there are blocks on the controlled coordinates
-                if self.tile_matrix[col][row] is not None and self.tile_matrix[col - 1][row] is not None:
-                    # check if the tiles in same column have the same number
-                    if self.tile_matrix[col - 1][row].number == self.tile_matrix[col][row].number:
-                        # change the merged tiles background colors to green, number colors to white
-                        self.tile_matrix[col - 1][row].background_color = Color(0, 255, 0)
-                        self.tile_matrix[col][row].background_color = Color(0, 255, 0)
-                        self.tile_matrix[col - 1][row].foreground_color = Color(255, 255, 255)
-                        self.tile_matrix[col][row].foreground_color = Color(255, 255, 255)
-                        # display the green tiles
-                        self.display()
-                        # multiply the tile's number by 2
-                        self.tile_matrix[col - 1][row].number *= 2
-                        # add merged numbers to score
-                        self.score += self.tile_matrix[col - 1][row].number
-                        # delete top tile
-                        self.tile_matrix[col][row] = None
-                        # update the grid colors
-                        self.updateGridColor()
-                        # check for hanging tiles on the merge column
-                        for i in range(col, up_merge_border):
-                            if self.tile_matrix[i][row] is not None:
-                                self.drop_tile(i, row)
-                        # change recursion variable to true
-                        merged = True
-                        # quit the loop
-                        break
-        # if a merge happened, call merge function again
-        if merged:
-            self.merge()
-
-    # Method for dropping tile
-    def drop_tile(self, i, k):
+        height = len(self.tile_matrix)
+        # a pair is given by the row of its top tile, a changed cell is the top
+        # tile of a pair and the bottom tile of the pair above it
+        pairs = set()
+        for row, col in self.dirty_cells:
+            for pair_row in (row, row + 1):
+                if 1 <= pair_row < height and self.can_merge(pair_row, col):
+                    pairs.add((0, pair_row, col))
+        worklist = sorted(pairs)
+        self.dirty_cells.clear()
+        # (pass, row) of the last merge, a pass makes one merge in each row
+        merged_row = None
+        i = 0
+        while i < len(worklist):
+            key = worklist[i]
+            i += 1
+            pairs.discard(key)
+            merge_pass, row, col = key
+            # the pair may have changed since it was added
+            if not self.can_merge(row, col):
+                continue
+            if (merge_pass, row) == merged_row:
+                self.add_pair(worklist, pairs, (merge_pass + 1, row, col))
+                continue
+            self.merge_tiles(row, col, up_merge_border, events, step)
+            merged_row = (merge_pass, row)
+            # the pairs of the cells changed by the merge (the merged tiles and
+            # the dropped tiles above them)
+            for changed_row, changed_col in self.dirty_cells:
+                for pair_row in (changed_row, changed_row + 1):
+                    if 1 <= pair_row < height and self.can_merge(pair_row, changed_col):
+                        next_pass = merge_pass if pair_row > row else merge_pass + 1
+                        self.add_pair(worklist, pairs, (next_pass, pair_row, changed_col))
+            self.dirty_cells.clear()
+
+    # Method for adding the given (pass, row, column) of a pair of tiles to the
+    # given sorted worklist of merge, unless it is in the given set of the
+    # pairs in the worklist; the new pairs are always after the current one
+    @staticmethod
+    def add_pair(worklist, pairs, key):
+        if key not in pairs:
+            pairs.add(key)
+            bisect.insort(worklist, key)
+
+    # Method for checking whether the tile on the given row and the tile below
+    # it in the given column have the same number
+    def can_merge(self, row, col):
+        top, bottom = self.tile_matrix[row, col], self.tile_matrix[row - 1, col]
+        return top is not None and bottom is not None and top.number == bottom.number
+
+    # Method for merging the tile on the given row into the tile below it, the
+    # tiles above it (up to the given border) are dropped
+    def merge_tiles(self, row, col, up_merge_border, events=None, step=0):
+        # change the merged tiles background colors to green, number colors to white
+        self.tile_matrix[row - 1][col].highlight()
+        self.tile_matrix[row][col].highlight()
+        # display the green tiles
+        self.display()
+        if events is not None:
+            events.append(CascadeEvent(step, "merge", row, col, self.tile_matrix[row][col].number))
+        # multiply the tile's number by 2
+        self.tile_matrix[row - 1][col].number *= 2
+        self.set_tile(row - 1, col, self.tile_matrix[row - 1][col])
+        # add merged numbers to score
+        self.score += self.tile_matrix[row - 1][col].number
+        # delete top tile, it is used again for a new tetromino
+        self.tile_matrix[row][col].release()
+        self.set_tile(row, col, None)
+        # update the color of the merged tile, it is the only tile whose number
+        # has changed
+        self.tile_matrix[row - 1][col].updateTileColor()
+        # check for hanging tiles on the merge column, from the bottom (a drop
+        # moves a tile down, so the tiles above it are where they were found)
+        tile_rows = np.flatnonzero(self.exponent_matrix[row:up_merge_border, col]) + row
+        for i in tile_rows.tolist():
+            self.drop_tile(i, col, events, step)
+
+    # Method for dropping tile, the drop is added to the given list of events
+    # (if any) for the given step
+    def drop_tile(self, i, k, events=None, step=0):
+        if events is not None and self.tile_matrix[i - 1][k] is None:
+            events.append(CascadeEvent(step, "drop", i, k, self.tile_matrix[i][k].number))
         # check if there is a tile with a space under it
         while self.tile_matrix[i - 1][k] is None:
             # move the tile down
             self.tile_matrix[i][k].move(0, -1)
             # move the tile down in matrix
-            self.tile_matrix[i - 1][k] = self.tile_matrix[i][k]
+            self.set_tile(i - 1, k, self.tile_matrix[i][k])
             # delete the top tile
-            self.tile_matrix[i][k] = None
+            self.set_tile(i, k, None)
+            self.drop_count += 1
             self.display()
 
-    # Method for moving isolated tiles down
-    def remove_gaps(self):
-        # recursive check variable
+    # Method for making a pass over the rows from the top and moving the
+    # isolated tiles down, the drops are added to the given list of events (if
+    # any) for the given step; it returns True if a tile is moved
+    def remove_gaps(self, events=None, step=0):
+        # check variable for another pass
         removed = False
+        # whether a tile is isolated depends on the two columns on each side of
+        # it, so only the columns near a changed column are checked
+        columns = sorted(self.neighbor_columns(self.dirty_columns))
         # check every row except start and finish columns
         for i in reversed(range(1, len(self.tile_matrix) - 1)):
-            # check every column
-            for k in range(len(self.tile_matrix[0])):
+            # check the columns from left to right, the list of the columns
+            # grows while the tiles are dropped
+            j = 0
+            while j < len(columns):
+                k = columns[j]
+                j += 1
+                drop_count = self.drop_count
                 # check if controlled tile exist
                 if self.tile_matrix[i][k] is not None:
                     # check if bottom tile do not exist
@@ -173,75 +371,127 @@ class GameGrid:
                         if k == (len(self.tile_matrix[0]) - 1) or k == (len(self.tile_matrix[0]) - 2):
                             if self.tile_matrix[i][k - 1] is None:
                                 # drop the tile as long as it can
-                                self.drop_tile(i, k)
+                                self.drop_tile(i, k, events, step)
                                 removed = True
                             else:
                                 if self.tile_matrix[i][k-2] is None and self.tile_matrix[i - 1][k - 1] is None and self.tile_matrix[i + 1][k - 1] is None:
                                     # drop the tile as long as it can
-                                    self.drop_tile(i, k)
+                                    self.drop_tile(i, k, events, step)
                                     # drop the left tile as long as it can
-                                    self.drop_tile(i, k-1)
+                                    self.drop_tile(i, k-1, events, step)
                                     removed = True
                         # if controlled column is starting column, only control the right side
                         elif k == 0 or k == 1:
                             if self.tile_matrix[i][k + 1] is None:
                                 # drop the tile as long as it can
-                                self.drop_tile(i, k)
+                                self.drop_tile(i, k, events, step)
                                 removed = True
                             else:
                                 if self.tile_matrix[i][k+2] is None and self.tile_matrix[i - 1][k + 1] is None and self.tile_matrix[i + 1][k + 1] is None:
                                     # drop the tile as long as it can
-                                    self.drop_tile(i, k)
+                                    self.drop_tile(i, k, events, step)
                                     # drop the right tile as long as it can
-                                    self.drop_tile(i, k+1)
+                                    self.drop_tile(i, k+1, events, step)
                                     removed = True
 
                         else:
                             if self.tile_matrix[i][k - 1] is None:
                                 if self.tile_matrix[i][k + 1] is None:
                                     # drop the tile as long as it can
-                                    self.drop_tile(i, k)
+                                    self.drop_tile(i, k, events, step)
                                     removed = True
                                 else:
                                     if self.tile_matrix[i][k+2] is None and self.tile_matrix[i-1][k+1] is None and self.tile_matrix[i+1][k+1] is None:
                                         # drop the tile as long as it can
-                                        self.drop_tile(i, k)
+                                        self.drop_tile(i, k, events, step)
                                         # drop the right tile as long as it can
-                                        self.drop_tile(i, k+1)
+                                        self.drop_tile(i, k+1, events, step)
                                         removed = True
                             else:
                                 if self.tile_matrix[i][k+1] is None:
                                     if self.tile_matrix[i][k-2] is None and self.tile_matrix[i+1][k-1] is None and self.tile_matrix[i-1][k-1] is None:
                                         # drop the tile as long as it can
-                                        self.drop_tile(i, k)
+                                        self.drop_tile(i, k, events, step)
                                         # drop the left tile as long as it can
-                                        self.drop_tile(i, k-1)
+                                        self.drop_tile(i, k-1, events, step)
                                         removed = True
+                # the tiles near the dropped tiles (in columns k - 1, k and
+                # k + 1) may be isolated now, the new columns on the left are
+                # checked from the next row as the checked ones
+                if self.drop_count != drop_count:
+                    for c in self.neighbor_columns((k - 1, k, k + 1)):
+                        index = bisect.bisect_left(columns, c)
+                        if index == len(columns) or columns[index] != c:
+                            columns.insert(index, c)
+                            if index < j:
+                                j += 1
 
         self.display()
-        # if a remove happened, check for another removes and merges
-        if removed:
-            self.merge()
-            self.remove_gaps()
-
-    # Method for drawing the cells and the lines of the grid
-    def draw_grid(self):
-        # draw each cell of the game grid
-        for row in range(self.grid_height):
-            for col in range(self.grid_width):
-                # draw the tile if the grid cell is occupied by a tile
-                if self.tile_matrix[row][col] is not None:
-                    self.tile_matrix[row][col].draw()
-                    # draw the inner lines of the grid
+        return removed
+
+    # Method for getting the set of the columns within two columns of the given
+    # columns, the column indexes wrap around as the negative indexes of the
+    # checks in remove_gaps do on narrow game grids
+    def neighbor_columns(self, columns):
+        width = len(self.tile_matrix[0])
+        return {(col + d) % width for col in columns for d in range(-2, 3)}
+
+    # Method for getting the static background layer, it is drawn only once
+    def get_background_layer(self):
+        if self.background_layer is None:
+            # clear the background canvas to empty_cell_color
+            stddraw.clear(self.empty_cell_color)
+            # draw the lines of the game grid
+            self.draw_grid_lines()
+            # draw a box around the game grid
+            self.draw_boundaries()
+            # draw the second grid for showing score and next tetromino
+            self.draw_information_grid()
+            self.background_layer = stddraw.snapshot()
+        return self.background_layer
+
+    # Method for getting the background layer with the score and the next
+    # tetromino of the given snapshot on it, it is drawn again only when one of
+    # them changes
+    def get_information_layer(self, snapshot):
+        key = (snapshot.score, snapshot.next_piece)
+        if self.information_layer is None or self.information_key != key:
+            stddraw.restore(self.get_background_layer())
+            self.draw_information(snapshot)
+            self.information_layer = stddraw.snapshot()
+            self.information_key = key
+        return self.information_layer
+
+    # Method for drawing the cells of the grid by writing their colors directly
+    # into the pixels of the canvas, the numbers are drawn only when the cells
+    # are large enough for reading them
+    def draw_grid_raster(self, exponents):
+        stddraw.cells(exponents, self.raster_palette, -0.5, -0.5,
+                      self.grid_width, self.grid_height, self.line_color)
+        if self.cell_size < GameGrid.raster_number_min_size:
+            return
+        stddraw.setFontFamily(Tile.font_family)
+        stddraw.setFontSize(Tile.font_size)
+        rows, cols = np.nonzero(exponents)
+        for row, col, exponent in zip(rows.tolist(), cols.tolist(),
+                                      exponents[rows, cols].tolist()):
+            if exponent >= 3:
+                stddraw.setPenColor(LIGHT_NUMBER_COLOR)
+            else:
+                stddraw.setPenColor(DARK_NUMBER_COLOR)
+            stddraw.boldText(col, row, str(1 << exponent))
+
+    # Method for drawing the inner lines of the grid
+    def draw_grid_lines(self):
         stddraw.setPenColor(self.line_color)
         stddraw.setPenRadius(self.line_thickness)
         # x and y ranges for the game grid
         start_x, end_x = -0.5, self.grid_width - 0.5
         start_y, end_y = -0.5, self.grid_height - 0.5
-        for x in np.arange(start_x + 1, end_x, 1):  # vertical inner lines
-            stddraw.line(x, start_y, x, end_y)
-        for y in np.arange(start_y + 1, end_y, 1):  # horizontal inner lines
-            stddraw.line(start_x, y, end_x, y)
+        xs = np.arange(start_x + 1, end_x, 1)
+        stddraw.lines(xs, start_y, xs, end_y)  # vertical inner lines
+        ys = np.arange(start_y + 1, end_y, 1)
+        stddraw.lines(start_x, ys, end_x, ys)  # horizontal inner lines
         stddraw.setPenRadius()  # reset the pen radius to its default value
 
     # Method for drawing the boundaries around the game grid
@@ -256,14 +506,27 @@ class GameGrid:
         stddraw.rectangle(pos_x, pos_y, self.grid_width, self.grid_height)
         stddraw.setPenRadius()  # reset the pen radius to its default value
 
+    # Method for putting the given tile (or None) on the grid cell with the given
+    # row and column indexes, all the changes of tile_matrix are done with this
+    # method so that exponent_matrix is kept in step with it
+    def set_tile(self, row, col, tile):
+        self.tile_matrix[row][col] = tile
+        self.dirty_columns.add(col)
+        self.dirty_cells.add((row, col))
+        if tile is None:
+            self.exponent_matrix[row, col] = 0
+        else:
+            self.exponent_matrix[row, col] = tile.number.bit_length() - 1
+
     # Method used for checking whether the grid cell with given row and column
     # indexes is occupied by a tile or empty
     def is_occupied(self, row, col):
         # return False if the cell is out of the grid
         if not self.is_inside(row, col):
             return False
-        # the cell is occupied by a tile if it is not None
-        return self.tile_matrix[row][col] is not None
+        # the cell is occupied by a tile if it is not None (indexed with a tuple,
+        # so that no view of the row is created)
+        return self.tile_matrix[row, col] is not None
 
     # Method used for checking whether the cell with given row and column indexes
     # is inside the game grid or not
@@ -287,7 +550,7 @@ class GameGrid:
                 if tiles_to_place[row][col] is not None:
                     pos = tiles_to_place[row][col].get_position()
                     if self.is_inside(pos.y, pos.x):
-                        self.tile_matrix[pos.y][pos.x] = tiles_to_place[row][col]
+                        self.set_tile(pos.y, pos.x, tiles_to_place[row][col])
                     # the game is over if any placed tile is out of the game grid
                     else:
                         self.game_over = True
@@ -304,14 +567,30 @@ class GameGrid:
         # draw the information grid
         stddraw.rectangle(pos_x + self.grid_width, pos_y, self.grid_width, self.grid_height)
         stddraw.filledRectangle(pos_x + self.grid_width, pos_y, self.grid_width, self.grid_height)
-        # print the information titles (SCORE and NEXT)
+        # print the information titles (SCORE and NEXT), NEXT is right above
+        # the next tetromino (its top row is 4)
+        stddraw.setPenColor(stddraw.BLACK)
+        stddraw.setFontSize(information_font_size(self.grid_width, self.cell_size))
+        line_h = self.information_line_height()
+        stddraw.boldText((self.full_grid_width - self.grid_width) / 2.6 + self.grid_width,
+                         self.grid_height - 0.5 - line_h / 2, "SCORE")
+        stddraw.boldText((self.full_grid_width - self.grid_width) / 2.6 + self.grid_width,
+                         4.5 + line_h / 2, "NEXT")
+
+    # Method for getting the height of a line of text on the information grid
+    # in grid cells (one cell for the 12 column game grid with 40 pixel cells)
+    def information_line_height(self):
+        font_size = information_font_size(self.grid_width, self.cell_size)
+        return font_size * 40 / 24 / self.cell_size
+
+    # Method for drawing the score and the next tetromino of the given snapshot
+    # on the information grid
+    def draw_information(self, snapshot):
         stddraw.setPenColor(stddraw.BLACK)
-        stddraw.setFontSize(self.grid_width * 2)
-        stddraw.boldText((self.full_grid_width - self.grid_width) / 2.6 + self.grid_width, self.grid_height - 1,
-                         "SCORE")
-        stddraw.boldText((self.full_grid_width - self.grid_width) / 2.6 + self.grid_width, 5, "NEXT")
-        # print the score
-        stddraw.boldText((self.full_grid_width - self.grid_width) / 2.6 + self.grid_width, self.grid_height - 2,
-                         str(self.score))
+        stddraw.setFontSize(information_font_size(self.grid_width, self.cell_size))
+        # print the score below the SCORE title
+        stddraw.boldText((self.full_grid_width - self.grid_width) / 2.6 + self.grid_width,
+                         self.grid_height - 0.5 - 1.5 * self.information_line_height(),
+                         str(snapshot.score))
         # draw the next tetromino on information grid
-        self.next_tetromino.draw()
+        Tile.draw_states(snapshot.next_piece)
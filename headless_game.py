@@ -0,0 +1,115 @@
+import random  # used for seeding the tetrominoes and the numbers of the tiles
+
+from board_engine import EndlessDropError  # raised when a drop would never end
+from game_grid import GameGrid  # class for modeling the game grid
+from tetromino import Tetromino  # used for creating random tetrominoes
+
+# keys a headless game can be stepped with, None is a step without a key
+KEYS = (None, "left", "right", "down", "a", "d", "space")
+
+
+# Class used for playing the game without a window: each step handles one key
+# and then moves the current tetromino down by one, exactly as an iteration of
+# the main game loop in Tetris_2048.play does; the game is played by the same
+# GameGrid and Tetromino objects (the legacy rules) and with the random module
+class HeadlessGame:
+    # Constructor that creates a game with the given dimensions of the grid
+    def __init__(self, grid_h=20, grid_w=12):
+        self.grid_h, self.grid_w = grid_h, grid_w
+        self.grid = None
+        self.current_tetromino = None
+        self.next_tetromino = None
+        # number of tetrominoes placed on the game grid
+        self.piece_count = 0
+
+    # Method for starting a new game, the random module is seeded with the
+    # given seed (if it is not None)
+    def reset(self, seed=None):
+        if seed is not None:
+            random.seed(seed)
+        grid_h, grid_w = self.grid_h, self.grid_w
+        self.grid = GameGrid(grid_h, grid_w, grid_h, grid_w + grid_w / 3)
+        self.grid.headless = True
+        self.current_tetromino = Tetromino.random(grid_h, grid_w)
+        self.current_tetromino.position()
+        self.grid.current_tetromino = self.current_tetromino
+        self.next_tetromino = Tetromino.random(grid_h, grid_w)
+        self.grid.next_tetromino = self.next_tetromino
+        self.piece_count = 0
+
+    # Method for handling the given key (one of KEYS) and moving the current
+    # tetromino down, it returns True when the game is over
+    def step(self, key):
+        grid, tetromino = self.grid, self.current_tetromino
+        if key in ("left", "right", "down"):
+            tetromino.move(key, grid)
+        elif key == "a":
+            tetromino.rotateTetromino(-1, grid)
+        elif key == "d":
+            tetromino.rotateTetromino(1, grid)
+        elif key == "space":
+            self.check_drop()
+            tetromino.drop(grid)
+        if tetromino.move("down", grid):
+            return False
+        # place the tetromino on the game grid when it cannot go down anymore
+        game_over = grid.update_grid(tetromino.tile_matrix)
+        grid.resolve()
+        self.piece_count += 1
+        if game_over:
+            return True
+        tetromino.release()
+        self.next_tetromino.position()
+        self.current_tetromino = self.next_tetromino
+        grid.current_tetromino = self.current_tetromino
+        self.next_tetromino = Tetromino.random(self.grid_h, self.grid_w)
+        grid.next_tetromino = self.next_tetromino
+        return False
+
+    # Method for raising EndlessDropError when the current tetromino would fall
+    # forever if it is dropped: Tetromino.drop checks the lowest tile of each
+    # column of the tile matrix, and never returns if all of them are below
+    # the grid (see BoardEngine.drop)
+    def check_drop(self):
+        tetromino = self.current_tetromino
+        n = len(tetromino.tile_matrix)
+        for col in range(n):
+            for row in range(n - 1, -1, -1):
+                tile = tetromino.tile_matrix[row][col]
+                if tile is not None:
+                    if tile.get_position().y >= 0:
+                        return
+                    break
+        raise EndlessDropError("the tetromino is below the grid and falls forever")
+
+    # Method for getting the exponents of the numbers of the tiles on the grid
+    # (0 for an empty cell)
+    def board(self):
+        return self.grid.exponent_matrix
+
+    # Method for getting the score of the game
+    def score(self):
+        return self.grid.score
+
+    # Method for checking if the game is over
+    def game_over(self):
+        return self.grid.game_over
+
+    # Method for getting the current tetromino as a tuple of the x and y of its
+    # bottom left corner and (row, column, x, y, exponent) for each of its tiles
+    def piece(self):
+        tetromino = self.current_tetromino
+        tiles = []
+        for row in range(tetromino.n):
+            for col in range(tetromino.n):
+                tile = tetromino.tile_matrix[row][col]
+                if tile is not None:
+                    position = tile.get_position()
+                    tiles.append((row, col, position.x, position.y,
+                                  tile.number.bit_length() - 1))
+        corner = tetromino.bottom_left_corner
+        return (corner.x, corner.y) + tuple(tiles)
+
+    # Method for getting the types of the current and the next tetromino
+    def piece_types(self):
+        return self.current_tetromino.type, self.next_tetromino.type
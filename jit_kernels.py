@@ -0,0 +1,122 @@
+import numpy as np  # fundamental Python module for scientific computing
+from numba import njit  # compiles the kernels (this module needs Numba)
+
+# Numba-compiled versions of the kernels of board_engine, working on the same
+# uint8 exponent boards; board_engine imports this module only when Numba is
+# installed and uses the NumPy kernels otherwise. The kernels are compiled the
+# first time they are called, and the compiled code is cached on the disk.
+
+
+# Kernel for merging the tiles with the same number on top of each other
+# (GameGrid.merge), see board_engine.merge_tiles
+@njit(cache=True)
+def merge_tiles(board, border):
+    height, width = board.shape
+    score = 0
+    merged = True
+    while merged:
+        merged = False
+        for row in range(1, height):
+            for col in range(width):
+                if board[row, col] != 0 and board[row, col] == board[row - 1, col]:
+                    board[row - 1, col] += 1
+                    score += 1 << np.int64(board[row - 1, col])
+                    board[row, col] = 0
+                    # each tile above the merge (up to the border) is dropped by
+                    # one row if the cell below it is empty
+                    for i in range(row + 1, border):
+                        if board[i, col] != 0 and board[i - 1, col] == 0:
+                            board[i - 1, col] = board[i, col]
+                            board[i, col] = 0
+                    merged = True
+                    # only the first merge of each row is made in a pass
+                    break
+    return score
+
+
+# Kernel for finding the full rows, see board_engine.full_rows
+@njit(cache=True)
+def full_rows(board):
+    height, width = board.shape
+    full = np.ones(height, dtype=np.bool_)
+    for row in range(height):
+        for col in range(width):
+            if board[row, col] == 0:
+                full[row] = False
+                break
+    return full
+
+
+# Kernel for dropping the tile in the given row and column by one row if the
+# cell below it is empty (GameGrid.drop_tile)
+@njit(cache=True)
+def _drop(board, i, k):
+    if board[i - 1, k] == 0:
+        board[i - 1, k] = board[i, k]
+        board[i, k] = 0
+
+
+# Kernel for making a pass over the rows from the top and dropping the
+# floating tiles by one row (a pass of GameGrid.remove_gaps), see
+# board_engine.drop_floating_tiles
+@njit(cache=True)
+def drop_floating_tiles(board):
+    height, width = board.shape
+    removed = False
+    for i in range(height - 2, 0, -1):
+        for k in range(width):
+            if board[i, k] == 0 or board[i - 1, k] != 0:
+                continue
+            if k == width - 1 or k == width - 2:
+                # only the left side is checked for the last two columns
+                if board[i, k - 1] == 0:
+                    _drop(board, i, k)
+                    removed = True
+                elif board[i, k - 2] == 0 and board[i - 1, k - 1] == 0 and board[i + 1, k - 1] == 0:
+                    _drop(board, i, k)
+                    _drop(board, i, k - 1)
+                    removed = True
+            elif k == 0 or k == 1:
+                # only the right side is checked for the first two columns
+                if board[i, k + 1] == 0:
+                    _drop(board, i, k)
+                    removed = True
+                elif board[i, k + 2] == 0 and board[i - 1, k + 1] == 0 and board[i + 1, k + 1] == 0:
+                    _drop(board, i, k)
+                    _drop(board, i, k + 1)
+                    removed = True
+            elif board[i, k - 1] == 0:
+                if board[i, k + 1] == 0:
+                    _drop(board, i, k)
+                    removed = True
+                elif board[i, k + 2] == 0 and board[i - 1, k + 1] == 0 and board[i + 1, k + 1] == 0:
+                    _drop(board, i, k)
+                    _drop(board, i, k + 1)
+                    removed = True
+            elif board[i, k + 1] == 0:
+                if board[i, k - 2] == 0 and board[i + 1, k - 1] == 0 and board[i - 1, k - 1] == 0:
+                    _drop(board, i, k)
+                    _drop(board, i, k - 1)
+                    removed = True
+    return removed
+
+
+# Kernel for finding how many rows the given tiles can move down on the board,
+# see board_engine.landing_distance (-1 is returned if no tile lands)
+@njit(cache=True)
+def landing_distance(board, xs, ys):
+    height, width = board.shape
+    distance = -1
+    for t in range(xs.shape[0]):
+        x, y = xs[t], ys[t]
+        if y < 0:
+            continue
+        tile_distance = y
+        if 0 <= x < width:
+            for row in range(min(y, height) - 1, -1, -1):
+                if board[row, x] != 0:
+                    tile_distance = y - row - 1
+                    break
+        if distance == -1 or tile_distance < distance:
+            distance = tile_distance
+    return distance
@@ -7,6 +7,7 @@ The picture module defines the Picture class.
 # -----------------------------------------------------------------------
 
 import os
+import threading
 
 import pygame
 
@@ -20,6 +21,11 @@ os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
 _DEFAULT_WIDTH = 512
 _DEFAULT_HEIGHT = 512
 
+# Pictures read from files, shared by the whole process and keyed by
+# file name.
+_cache = {}
+_cacheLock = threading.Lock()
+
 
 # -----------------------------------------------------------------------
 
@@ -57,6 +63,23 @@ class Picture:
             self._surface.fill((0, 0, 0))
         else:
             raise ValueError()
+        self._converted = False
+
+    # -------------------------------------------------------------------
+
+    def _convert(self):
+        """
+        Convert the pixels of self to the pixel format of the window
+        so that drawing self is fast. Do nothing if there is no window
+        yet or if self has already been converted.
+        """
+        if self._converted or (pygame.display.get_surface() is None):
+            return
+        if self._surface.get_flags() & pygame.SRCALPHA:
+            self._surface = self._surface.convert_alpha()
+        else:
+            self._surface = self._surface.convert()
+        self._converted = True
 
     # -------------------------------------------------------------------
 
@@ -100,3 +123,39 @@ class Picture:
         """
         pygameColor = pygame.Color(c.getRed(), c.getGreen(), c.getBlue(), 0)
         self._surface.set_at((x, y), pygameColor)
+
+
+# -----------------------------------------------------------------------
+
+def load(fileName):
+    """
+    Return the Picture read from the file whose name is fileName. The
+    file is read only once; later calls return the same Picture. The
+    Picture is converted for fast drawing as soon as the window exists.
+    """
+    with _cacheLock:
+        pic = _cache.get(fileName)
+        if pic is None:
+            pic = Picture(fileName)
+            _cache[fileName] = pic
+        pic._convert()
+    return pic
+
+
+def preload(fileNames):
+    """
+    Start reading the files whose names are in fileNames into the
+    cache used by load() on a background thread, and return the thread.
+    """
+    fileNames = list(fileNames)
+
+    def _loadAll():
+        for fileName in fileNames:
+            try:
+                load(fileName)
+            except IOError:
+                pass  # reported again when the picture is really needed
+
+    thread = threading.Thread(target=_loadAll, daemon=True)
+    thread.start()
+    return thread
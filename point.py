@@ -1,5 +1,12 @@
 # A class for representing a point as a location in 2D space
+# A tile in play owns the point of its position (Tetromino.position gives each
+# tile a new point) and changes it in place when it is moved or rotated; the
+# tiles of the next tetromino share the points of their prototype, they are
+# never moved until Tetromino.position replaces them
 class Point:
+    # store x and y in fixed slots instead of a per-instance dictionary
+    __slots__ = ('x', 'y')
+
     # constructor that creates a point at the given (x, y) location
     # default values for the given location are set as x = 0 and y = 0
     def __init__(self, x=0, y=0):
@@ -0,0 +1,116 @@
+import cProfile  # used for the deterministic profiles
+import collections  # used for counting the sampled stacks
+import os  # used for file and directory operations
+import sys  # used for reading the stacks of the running threads
+import threading  # used for sampling the stacks on a background thread
+import time  # used for the duration of a profile and the file names
+
+# the formats a profile can be written in: a pstats dump of cProfile (which can
+# be read with the pstats module or snakeviz), or the stacks sampled at fixed
+# intervals in the collapsed (folded) format read by flame graph tools
+FORMATS = ("collapsed", "pstats")
+# extensions of the files written in each format
+EXTENSIONS = {"collapsed": ".folded", "pstats": ".pstats"}
+
+
+# Class used for profiling the game while it is being played: a session is
+# started and stopped with a hotkey, or stops by itself after a given number
+# of seconds, and is then written to a file in the given directory
+class Profiler:
+    # Constructor that creates a profiler writing profiles of at most seconds
+    # seconds to the given directory in the given format, the stacks are
+    # sampled every interval seconds in the collapsed format
+    def __init__(self, directory, format="collapsed", seconds=10, interval=0.002):
+        if format not in FORMATS:
+            raise ValueError("format must be one of " + ", ".join(FORMATS))
+        self.directory = directory
+        self.format = format
+        self.seconds = seconds
+        self.interval = interval
+        # tag added to the name of the file of the current session
+        self.tag = None
+        self.deadline = None
+        self.profile = None
+        self.sampler = None
+        self.stopped = threading.Event()
+        # number of times each collapsed stack has been sampled
+        self.stack_counts = None
+
+    # Method for checking if a profiling session is running
+    def active(self):
+        return self.tag is not None
+
+    # Method for starting a profiling session, the given tag (e.g. the board
+    # size and the difficulty) is added to the name of the file
+    def start(self, tag):
+        self.tag = tag
+        self.deadline = time.perf_counter() + self.seconds
+        if self.format == "pstats":
+            # cProfile profiles the thread that enables it (the game loop)
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.stack_counts = collections.Counter()
+            self.stopped.clear()
+            self.sampler = threading.Thread(target=self._sample, daemon=True)
+            self.sampler.start()
+
+    # Method for starting a session if none is running and stopping the running
+    # session otherwise, it returns the path of the file written (if any)
+    def toggle(self, tag):
+        if self.active():
+            return self.stop()
+        self.start(tag)
+        return None
+
+    # Method called by the game loop at each step, it stops the session when its
+    # time is up and returns the path of the file written (if any)
+    def poll(self):
+        if self.active() and time.perf_counter() >= self.deadline:
+            return self.stop()
+        return None
+
+    # Method for stopping the session and writing the profile, it returns the
+    # path of the file written
+    def stop(self):
+        if self.format == "pstats":
+            self.profile.disable()
+        else:
+            self.stopped.set()
+            self.sampler.join()
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = "profile_%s_%s%s" % (self.tag, time.strftime("%Y%m%d-%H%M%S"),
+                                         EXTENSIONS[self.format])
+        path = os.path.join(self.directory, file_name)
+        if self.format == "pstats":
+            self.profile.dump_stats(path)
+            self.profile = None
+        else:
+            with open(path, "w") as file:
+                for stack, count in self.stack_counts.most_common():
+                    file.write("%s %d\n" % (stack, count))
+            self.stack_counts = None
+            self.sampler = None
+        self.tag = None
+        return path
+
+    # Method run by the sampler thread: record the stacks of all the other
+    # threads every interval seconds until the session is stopped or its time
+    # is up, each stack starts with the name of its thread
+    def _sample(self):
+        names = {}
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval) and time.perf_counter() < self.deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append("%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename),
+                                                 code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, "thread"))
+                self.stack_counts[";".join(reversed(stack))] += 1
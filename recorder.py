@@ -0,0 +1,214 @@
+import json  # used for the description of a raw frame file
+import os  # used for file and directory operations
+import queue  # used for passing the captured frames to the writer thread
+import shutil  # used for finding ffmpeg
+import subprocess  # used for running ffmpeg
+import sys
+import threading  # used for writing the frames on a background thread
+import time  # used for the time stamps of the frames
+
+import numpy as np  # fundamental Python module for scientific computing
+import pygame
+import pygame.surfarray  # used for copying the pixels of the canvas
+
+import stddraw  # the stddraw module is used as a basic graphics library
+
+# the formats the frames can be written in: a sequence of PNG files, or a
+# single raw file of RGB frames that can be read back as a memory map
+FORMATS = ("png", "raw")
+# name of the raw frame file and of its description in the output directory
+RAW_FILE_NAME = "frames.raw"
+RAW_INFO_FILE_NAME = "frames.json"
+
+
+# Class used for recording the frames shown by stddraw without blocking the
+# game loop: each shown frame is copied into a preallocated ring of buffers,
+# and a background thread writes the buffers to the disk
+class Recorder:
+    # Constructor that creates a recorder writing to the given directory in the
+    # given format, using ring_size buffers for the frames not written yet
+    def __init__(self, directory, format="png", ring_size=16):
+        if format not in FORMATS:
+            raise ValueError("format must be one of " + ", ".join(FORMATS))
+        self.directory = directory
+        self.format = format
+        self.ring_size = ring_size
+        # the ring of frame buffers is allocated when the first frame is seen
+        self.buffers = None
+        # indexes of the buffers that can be filled and of the filled buffers
+        # waiting for the writer thread (None stops the writer thread)
+        self.free_buffers = queue.Queue()
+        self.filled_buffers = queue.Queue()
+        # number of the frames captured, and dropped because the writer thread
+        # was too slow and there was no free buffer
+        self.frame_count = 0
+        self.dropped_count = 0
+        # time stamps (in seconds after the start of the recording) of the
+        # captured frames
+        self.frame_times = []
+        self.start_time = None
+        self.writer = None
+        self.raw_file = None
+
+    # Method for starting the recording, the frames are captured each time the
+    # canvas is shown by stddraw
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.start_time = time.perf_counter()
+        self.writer = threading.Thread(target=self._write_frames, daemon=True)
+        self.writer.start()
+        stddraw.addFrameListener(self.capture)
+
+    # Method for stopping the recording, it returns when all the captured frames
+    # have been written
+    def stop(self):
+        stddraw.removeFrameListener(self.capture)
+        self.filled_buffers.put(None)
+        self.writer.join()
+        if self.raw_file is not None:
+            self.raw_file.close(self.frame_times)
+            self.raw_file = None
+
+    # Method for copying the given surface into a free buffer of the ring, the
+    # frame is dropped if the writer thread is behind and all buffers are full
+    def capture(self, surface):
+        if self.buffers is None:
+            width, height = surface.get_size()
+            self.buffers = np.empty((self.ring_size, width, height, 3), dtype=np.uint8)
+            for i in range(self.ring_size):
+                self.free_buffers.put(i)
+        try:
+            index = self.free_buffers.get_nowait()
+        except queue.Empty:
+            self.dropped_count += 1
+            return
+        pixels = pygame.surfarray.pixels3d(surface)
+        np.copyto(self.buffers[index], pixels)
+        del pixels  # unlock the surface
+        self.frame_times.append(time.perf_counter() - self.start_time)
+        self.filled_buffers.put((index, self.frame_count))
+        self.frame_count += 1
+
+    # Method run by the writer thread for writing the filled buffers in order
+    def _write_frames(self):
+        while True:
+            item = self.filled_buffers.get()
+            if item is None:
+                return
+            index, frame_number = item
+            # buffers are indexed by (x, y), the files store rows of pixels
+            frame = self.buffers[index]
+            if self.format == "png":
+                file_name = os.path.join(self.directory, "frame_%06d.png" % frame_number)
+                pygame.image.save(pygame.surfarray.make_surface(frame), file_name)
+            else:
+                if self.raw_file is None:
+                    self.raw_file = RawFrameFile(self.directory, frame.shape[1], frame.shape[0])
+                self.raw_file.append(frame.transpose(1, 0, 2))
+            self.free_buffers.put(index)
+
+
+# Class used for appending frames to a raw file through a memory map, the file
+# grows in chunks so that it is not mapped again for each frame
+class RawFrameFile:
+    # number of frames the file grows by when it is full
+    chunk_frames = 64
+
+    # Constructor that creates an empty raw frame file in the given directory
+    # for frames with the given height and width (in pixels)
+    def __init__(self, directory, height, width):
+        self.directory = directory
+        self.path = os.path.join(directory, RAW_FILE_NAME)
+        self.frame_shape = (height, width, 3)
+        self.frame_bytes = height * width * 3
+        self.count = 0
+        self.capacity = 0
+        self.frames = None
+        open(self.path, "wb").close()
+
+    # Method for appending a frame given as an array of shape (height, width, 3)
+    def append(self, frame):
+        if self.count == self.capacity:
+            self._grow()
+        self.frames[self.count] = frame
+        self.count += 1
+
+    # Method for making the file larger by chunk_frames frames and mapping it
+    def _grow(self):
+        if self.frames is not None:
+            self.frames.flush()
+            self.frames = None
+        self.capacity += RawFrameFile.chunk_frames
+        with open(self.path, "r+b") as file:
+            file.truncate(self.capacity * self.frame_bytes)
+        self.frames = np.memmap(self.path, dtype=np.uint8, mode="r+",
+                                shape=(self.capacity,) + self.frame_shape)
+
+    # Method for cutting the unused end of the file and writing the description
+    # of the file with the given time stamps of the frames
+    def close(self, frame_times):
+        if self.frames is not None:
+            self.frames.flush()
+            self.frames = None
+        with open(self.path, "r+b") as file:
+            file.truncate(self.count * self.frame_bytes)
+        info = {"count": self.count, "height": self.frame_shape[0],
+                "width": self.frame_shape[1], "times": frame_times[:self.count]}
+        with open(os.path.join(self.directory, RAW_INFO_FILE_NAME), "w") as file:
+            json.dump(info, file)
+
+
+# Function for reading the frames recorded in the raw format in the given
+# directory, it returns a read-only memory map of shape (count, height, width,
+# 3) and the time stamps of the frames
+def read_frames(directory):
+    with open(os.path.join(directory, RAW_INFO_FILE_NAME)) as file:
+        info = json.load(file)
+    if info["count"] == 0:
+        return np.empty((0, info["height"], info["width"], 3), dtype=np.uint8), []
+    frames = np.memmap(os.path.join(directory, RAW_FILE_NAME), dtype=np.uint8, mode="r",
+                       shape=(info["count"], info["height"], info["width"], 3))
+    return frames, info["times"]
+
+
+# Function for writing the frames recorded in the raw format as PNG files
+def export_png(directory, output_directory):
+    frames, times = read_frames(directory)
+    os.makedirs(output_directory, exist_ok=True)
+    for i in range(len(frames)):
+        surface = pygame.surfarray.make_surface(frames[i].transpose(1, 0, 2))
+        pygame.image.save(surface, os.path.join(output_directory, "frame_%06d.png" % i))
+
+
+# Function for encoding the frames recorded in the raw format as a video with
+# ffmpeg, which reads the raw file directly and can be much faster than real
+# time; the frame rate is computed from the time stamps when it is not given
+def export_video(directory, output_file, fps=None):
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg is needed for exporting a video, use export_png instead")
+    frames, times = read_frames(directory)
+    if fps is None:
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 else 1
+    height, width = frames.shape[1], frames.shape[2]
+    subprocess.run([ffmpeg, "-y", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                    "-s", "%dx%d" % (width, height), "-r", "%.3f" % fps,
+                    "-i", os.path.join(directory, RAW_FILE_NAME),
+                    "-pix_fmt", "yuv420p", output_file], check=True)
+
+
+# Exports a raw recording from the command line:
+#   python recorder.py png <recording directory> <output directory>
+#   python recorder.py video <recording directory> <output file> [fps]
+def _main():
+    if len(sys.argv) >= 4 and sys.argv[1] == "png":
+        export_png(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) >= 4 and sys.argv[1] == "video":
+        fps = float(sys.argv[4]) if len(sys.argv) > 4 else None
+        export_video(sys.argv[2], sys.argv[3], fps)
+    else:
+        print("usage: python recorder.py png|video <recording directory> <output> [fps]")
+
+
+if __name__ == '__main__':
+    _main()
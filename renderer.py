@@ -0,0 +1,77 @@
+import threading  # used for running the rendering on its own thread
+import time  # used for keeping the frame rate
+
+import stddraw  # the stddraw module is used as a basic graphics library
+
+
+# Class used for drawing the snapshots published by the game logic on a
+# separate render thread, so that a slow frame does not delay the game logic
+# and slow game logic does not delay the frames
+class RenderThread:
+    # Constructor that creates a render thread drawing each snapshot with the
+    # given draw function at most fps times per second
+    def __init__(self, draw, fps=60):
+        self.draw = draw
+        self.frame_time = 1.0 / fps
+        # double buffer of snapshots: the logic thread writes the back buffer
+        # and then swaps it with the front buffer read by the render thread
+        self.buffers = [None, None]
+        self.front = 0
+        # number of snapshots published so far
+        self.version = 0
+        self.lock = threading.Lock()
+        # set when a new snapshot is published or the thread is stopped
+        self.changed = threading.Event()
+        self.running = False
+        self.thread = None
+        # number of frames drawn, and of snapshots skipped because a newer one
+        # was published before they could be drawn
+        self.frame_count = 0
+        self.skipped_count = 0
+
+    # Method for publishing a snapshot, it never waits for the drawing
+    def publish(self, snapshot):
+        with self.lock:
+            back = 1 - self.front
+            self.buffers[back] = snapshot
+            self.front = back
+            self.version += 1
+        self.changed.set()
+
+    # Method for getting the latest published snapshot and its version
+    def latest(self):
+        with self.lock:
+            return self.buffers[self.front], self.version
+
+    # Method for starting the render thread
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    # Method for stopping the render thread, it returns after the last frame
+    def stop(self):
+        self.running = False
+        self.changed.set()
+        self.thread.join()
+
+    # Method run by the render thread: draw the latest snapshot whenever a new
+    # one is published, at most once per frame time
+    def _run(self):
+        drawn_version = 0
+        while self.running:
+            self.changed.wait()
+            self.changed.clear()
+            snapshot, version = self.latest()
+            if not self.running or version == drawn_version:
+                continue
+            frame_start = time.perf_counter()
+            self.skipped_count += version - drawn_version - 1
+            drawn_version = version
+            self.draw(snapshot)
+            stddraw.present()
+            self.frame_count += 1
+            # keep the frame rate, newer snapshots are drawn in the next frame
+            remaining = self.frame_time - (time.perf_counter() - frame_start)
+            if remaining > 0:
+                time.sleep(remaining)
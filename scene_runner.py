@@ -0,0 +1,108 @@
+import asyncio  # used for running the scenes and the background tasks
+import time  # used for measuring the time spent by the idle listeners
+
+import stddraw  # the stddraw module is used as a basic graphics library
+
+
+# Class used for running the scenes of the game (menus and the game itself) as
+# coroutines on a single asyncio event loop; the waits of the scenes (menu
+# frames, gravity ticks) are asyncio sleeps, so other tasks such as telemetry,
+# bots or network feeds can run on the same loop in the meantime
+#
+# The scenes form a state machine: a scene is a coroutine function that takes
+# the runner and its own arguments, and returns the next scene as a tuple
+# (scene, *arguments), or None for ending the game; the scenes are run one
+# after the other by a flat loop, so a scene never calls another one and all
+# the state of a scene (e.g. the game grid of a game) is released when it ends
+class SceneRunner:
+    # Constructor that creates a runner without any background tasks, the
+    # waits of the scenes are multiplied by time_scale (0 for not waiting)
+    def __init__(self, time_scale=1.0):
+        self.tasks = set()
+        self.loop = None
+        self.time_scale = time_scale
+        # longest time (in ms) a worker thread blocks while waiting for an
+        # event, the wait is started again when no event occurs (it bounds the
+        # time the runner waits for the thread when the scenes end)
+        self.event_timeout = 100
+        # functions called with the scene and its arguments before each scene
+        self.scene_listeners = []
+        # functions called at the start of each wait, when the game is idle
+        self.idle_listeners = []
+        # number of scenes run so far
+        self.scene_count = 0
+
+    # Method for running the scenes starting from the given scene and its
+    # arguments until a scene returns None, the background tasks are cancelled
+    # when the scenes end
+    def run(self, scene, *args):
+        asyncio.run(self._run(scene, args))
+
+    async def _run(self, scene, args):
+        self.loop = asyncio.get_running_loop()
+        try:
+            while scene is not None:
+                for listener in list(self.scene_listeners):
+                    listener(scene, args)
+                self.scene_count += 1
+                next_scene = await scene(self, *args)
+                # drop the references to the finished scene before the next one
+                scene, args = None, ()
+                if next_scene is not None:
+                    scene, args = next_scene[0], next_scene[1:]
+        finally:
+            for task in list(self.tasks):
+                task.cancel()
+            if self.tasks:
+                await asyncio.gather(*self.tasks, return_exceptions=True)
+            self.loop = None
+
+    # Method for starting a background task from the given coroutine, the task
+    # runs on the loop of the scenes until it ends or the runner stops
+    def spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    # Coroutine for showing the canvas and then waiting for msec milliseconds
+    async def show(self, msec):
+        stddraw.present()
+        await self.wait(msec)
+
+    # Coroutine for waiting for msec milliseconds while the other tasks run,
+    # the events (keys typed, mouse clicks) are checked at the end of the wait;
+    # the time spent by the idle listeners is a part of the wait
+    async def wait(self, msec):
+        started = time.perf_counter()
+        self._idle()
+        remaining = msec * self.time_scale / 1000.0 - (time.perf_counter() - started)
+        await asyncio.sleep(max(remaining, 0))
+        stddraw.wait(0)
+
+    # Coroutine for showing the canvas and then waiting until an event occurs,
+    # used by the scenes that only change when the user does something (menus,
+    # paused game) so that they use no CPU while the user is idle
+    async def show_on_event(self):
+        stddraw.present()
+        await self.wait_for_event()
+
+    # Coroutine for waiting until an event (such as a key typed or a mouse
+    # click) occurs and handling it; the wait blocks a worker thread of the
+    # loop without holding the display lock of stddraw, so neither the loop
+    # (and the other tasks on it) nor a render thread showing a frame is
+    # blocked, and no CPU is used while the user is idle. The event is handled
+    # on the loop, as the events read by the other waits
+    async def wait_for_event(self):
+        self._idle()
+        loop = asyncio.get_running_loop()
+        while True:
+            event = await loop.run_in_executor(None, stddraw.nextEvent,
+                                               self.event_timeout * self.time_scale)
+            if stddraw.handleEvents(event):
+                return
+
+    # Method for calling the idle listeners
+    def _idle(self):
+        for listener in self.idle_listeners:
+            listener()
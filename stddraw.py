@@ -9,18 +9,19 @@ commonly used Color objects defined in the color module.
 
 import os
 import sys
+import threading
 import time
 
+import numpy as np
+
 import color
 
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
 import pygame
-import pygame.gfxdraw
-import pygame.font
 
-import tkinter as Tkinter
-import tkinter.messagebox as tkMessageBox
-import tkinter.filedialog as tkFileDialog
+# pygame.gfxdraw, pygame.surfarray and tkinter are imported by the functions
+# that use them, and the font module is initialized when the first font is
+# needed, so that importing this module stays fast.
 
 # -----------------------------------------------------------------------
 
@@ -65,6 +66,16 @@ _ymax = None
 _fontFamily = _DEFAULT_FONT_FAMILY
 _fontSize = _DEFAULT_FONT_SIZE
 
+# Fonts created so far, keyed by (family, size, bold), and the lock that
+# keeps a font from being created by two threads at the same time.
+_fonts = {}
+_fontLock = threading.Lock()
+
+# Rendered strings (glyph images) keyed by (family, size, bold, string,
+# color). The cache is emptied when it grows to _MAX_GLYPHS entries.
+_glyphs = {}
+_MAX_GLYPHS = 4096
+
 _canvasWidth = float(_DEFAULT_CANVAS_SIZE)
 _canvasHeight = float(_DEFAULT_CANVAS_SIZE)
 _penRadius = None
@@ -74,6 +85,17 @@ _keysTyped = []
 # Has the window been created?
 _windowCreated = False
 
+# Is the canvas drawn offscreen instead of in a window?
+_offscreen = False
+
+# Functions that are called with the background canvas each time it is
+# shown.
+_frameListeners = []
+
+# Lock that keeps the window from being updated by one thread while
+# another thread checks for events.
+_displayLock = threading.RLock()
+
 # -----------------------------------------------------------------------
 # Begin added by Alan J. Broder
 # -----------------------------------------------------------------------
@@ -93,15 +115,21 @@ _mousePos = None
 
 # -----------------------------------------------------------------------
 
+# The pygame.Color objects converted so far, keyed by color.Color.
+_pygameColors = {}
+
+
 def _pygameColor(c):
     """
     Convert c, an object of type color.Color, to an equivalent object
-    of type pygame.Color.  Return the result.
+    of type pygame.Color.  Return the result.  Each color is converted
+    only once; the result must not be modified.
     """
-    r = c.getRed()
-    g = c.getGreen()
-    b = c.getBlue()
-    return pygame.Color(r, g, b)
+    pc = _pygameColors.get(c)
+    if pc is None:
+        pc = pygame.Color(c.getRed(), c.getGreen(), c.getBlue())
+        _pygameColors[c] = pc
+    return pc
 
 
 # -----------------------------------------------------------------------
@@ -161,13 +189,35 @@ def setCanvasSize(w=_DEFAULT_CANVAS_SIZE, h=_DEFAULT_CANVAS_SIZE):
 
     _canvasWidth = w
     _canvasHeight = h
-    _background = pygame.display.set_mode([w, h])
-    pygame.display.set_caption('stddraw window (r-click to save)')
+    if _offscreen:
+        # events still need the display module, but no window is opened
+        pygame.display.init()
+        _background = None
+    else:
+        _background = pygame.display.set_mode([w, h])
+        pygame.display.set_caption('stddraw window (r-click to save)')
     _surface = pygame.Surface((w, h))
     _surface.fill(_pygameColor(WHITE))
     _windowCreated = True
 
 
+def setOffscreen(flag=True):
+    """
+    If flag is True, draw on a canvas that is never shown in a window.
+    Calling this function is optional. If you call it, you must do so
+    before calling setCanvasSize() or any drawing function. Unless
+    another SDL video driver is selected, the offscreen canvas uses the
+    dummy driver, so it also works on machines without a display.
+    Keys and mouse clicks can still be sent with pygame.event.post().
+    """
+    global _offscreen
+    if _windowCreated:
+        raise Exception('setOffscreen() must be called before the canvas is created')
+    _offscreen = flag
+    if flag:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+
 def setXscale(min=_DEFAULT_XMIN, max=_DEFAULT_XMAX):
     """
     Set the x-scale of the canvas such that the minimum x value
@@ -256,6 +306,7 @@ def _pixel(x, y):
     """
     Draw on the background canvas a pixel at (x, y).
     """
+    import pygame.gfxdraw
     _makeSureWindowCreated()
     xs = _scaleX(x)
     xy = _scaleY(y)
@@ -416,6 +467,161 @@ def filledRectangle(x, y, w, h):
             0)
 
 
+def _colorGroups(colors, n):
+    """
+    Return a list of (pygame color, indices) pairs that groups the n
+    indices of the shapes to draw by their colors. colors is a sequence
+    of color.Color objects, or None to draw all the shapes with the
+    pen color.
+    """
+    if colors is None:
+        return [(_pygameColor(_penColor), range(n))]
+    groups = {}
+    for i, c in enumerate(colors):
+        indices = groups.get(c)
+        if indices is None:
+            groups[c] = [i]
+        else:
+            indices.append(i)
+    return [(_pygameColor(c), indices) for c, indices in groups.items()]
+
+
+def _scaleRectangles(x, y, w, h):
+    """
+    Scale the rectangles whose lower left points are (x[i], y[i]) and
+    whose sizes are w[i] by h[i] to the canvas in one vectorized step.
+    Return the arrays of the left, top, width and height values in
+    pixels, together with the array of the scaled y values.
+    """
+    x, y, w, h = np.broadcast_arrays(
+        np.asarray(x, dtype=float), np.asarray(y, dtype=float),
+        np.asarray(w, dtype=float), np.asarray(h, dtype=float))
+    xs = _canvasWidth * (x - _xmin) / (_xmax - _xmin)
+    ys = _canvasHeight * (_ymax - y) / (_ymax - _ymin)
+    ws = w * _canvasWidth / abs(_xmax - _xmin)
+    hs = h * _canvasHeight / abs(_ymax - _ymin)
+    return xs.tolist(), (ys - hs).tolist(), ws.tolist(), hs.tolist(), ys.tolist()
+
+
+def rectangles(x, y, w, h, colors=None):
+    """
+    Draw on the background canvas the rectangles whose lower left points
+    are (x[i], y[i]) and whose sizes are w[i] by h[i]. x, y, w and h are
+    sequences or NumPy arrays of the same length, or numbers shared by
+    all the rectangles. colors[i] is the color.Color of rectangle i; if
+    colors is None, all the rectangles are drawn with the pen color.
+    Rectangles with the same color are drawn one after another, so
+    overlapping rectangles of different colors may not be drawn in the
+    given order.
+    """
+    _makeSureWindowCreated()
+    xs, ts, ws, hs, ys = _scaleRectangles(x, y, w, h)
+    width = int(round(_penRadius))
+    for pc, indices in _colorGroups(colors, len(xs)):
+        for i in indices:
+            # If the rectangle is too small, then simply draw a pixel.
+            if (ws[i] <= 1.0) and (hs[i] <= 1.0):
+                _surface.set_at((int(round(xs[i])), int(round(ys[i]))), pc)
+            else:
+                pygame.draw.rect(
+                    _surface, pc, pygame.Rect(xs[i], ts[i], ws[i], hs[i]), width)
+
+
+def filledRectangles(x, y, w, h, colors=None):
+    """
+    Draw on the background canvas the filled rectangles whose lower left
+    points are (x[i], y[i]) and whose sizes are w[i] by h[i]. The
+    arguments are the same as the arguments of rectangles().
+    """
+    _makeSureWindowCreated()
+    xs, ts, ws, hs, ys = _scaleRectangles(x, y, w, h)
+    for pc, indices in _colorGroups(colors, len(xs)):
+        for i in indices:
+            # If the rectangle is too small, then simply draw a pixel.
+            if (ws[i] <= 1.0) and (hs[i] <= 1.0):
+                _surface.set_at((int(round(xs[i])), int(round(ys[i]))), pc)
+            else:
+                pygame.draw.rect(
+                    _surface, pc, pygame.Rect(xs[i], ts[i], ws[i], hs[i]), 0)
+
+
+def lines(x0, y0, x1, y1, colors=None):
+    """
+    Draw on the background canvas the lines from (x0[i], y0[i]) to
+    (x1[i], y1[i]). x0, y0, x1 and y1 are sequences or NumPy arrays of
+    the same length, or numbers shared by all the lines. colors is the
+    same as the colors argument of rectangles().
+    """
+    _makeSureWindowCreated()
+    x0, y0, x1, y1 = np.broadcast_arrays(
+        np.asarray(x0, dtype=float), np.asarray(y0, dtype=float),
+        np.asarray(x1, dtype=float), np.asarray(y1, dtype=float))
+    x0s = (_canvasWidth * (x0 - _xmin) / (_xmax - _xmin)).tolist()
+    y0s = (_canvasHeight * (_ymax - y0) / (_ymax - _ymin)).tolist()
+    x1s = (_canvasWidth * (x1 - _xmin) / (_xmax - _xmin)).tolist()
+    y1s = (_canvasHeight * (_ymax - y1) / (_ymax - _ymin)).tolist()
+    lineWidth = _penRadius
+    if lineWidth == 0.0: lineWidth = 1.0
+    lineWidth = int(round(lineWidth))
+    for pc, indices in _colorGroups(colors, len(x0s)):
+        for i in indices:
+            pygame.draw.line(
+                _surface, pc, (x0s[i], y0s[i]), (x1s[i], y1s[i]), lineWidth)
+
+
+# Palettes mapped to the pixel format of the canvas by cells(), keyed
+# by the tuple of their colors.
+_mappedPalettes = {}
+
+
+def cells(indices, palette, x, y, w, h, borderColor=None):
+    """
+    Draw on the background canvas a grid of colored cells that fills
+    the rectangle of width w and height h whose lower left point is
+    (x, y). indices is a 2D NumPy array of indices into palette, a
+    sequence of color.Color objects, and its first row is the bottom
+    row of the grid. If borderColor is a color.Color and the cells are
+    at least 4 pixels wide, the first column and row of pixels of each
+    cell are drawn with it. The pixels of the canvas are written
+    directly, so the time needed depends on the size of the rectangle
+    in pixels, not on the number of cells.
+    """
+    import pygame.surfarray
+    _makeSureWindowCreated()
+    palette = tuple(palette)
+    mapped = _mappedPalettes.get(palette)
+    if mapped is None:
+        mapped = np.array([_surface.map_rgb(_pygameColor(c)) for c in palette],
+                          dtype=np.uint32)
+        _mappedPalettes[palette] = mapped
+    rows, cols = indices.shape
+    # the rectangle in pixels, before and after clipping to the canvas
+    left, right = _scaleX(x), _scaleX(x + w)
+    top, bottom = _scaleY(y + h), _scaleY(y)
+    x0 = max(int(round(left)), 0)
+    x1 = min(int(round(right)), int(_canvasWidth))
+    y0 = max(int(round(top)), 0)
+    y1 = min(int(round(bottom)), int(_canvasHeight))
+    if (x0 >= x1) or (y0 >= y1):
+        return
+    # the column and the row of the cell under the center of each pixel
+    colOf = ((np.arange(x0, x1) + 0.5 - left) * cols / (right - left)).astype(np.intp)
+    rowOf = ((np.arange(y0, y1) + 0.5 - top) * rows / (bottom - top)).astype(np.intp)
+    np.clip(colOf, 0, cols - 1, out=colOf)
+    np.clip(rowOf, 0, rows - 1, out=rowOf)
+    # color the cells first and then scale them up to pixels, the canvas is
+    # indexed by (x, y) with y growing downwards
+    cellPixels = mapped[indices.T]
+    image = cellPixels[colOf[:, None], (rows - 1 - rowOf)[None, :]]
+    if (borderColor is not None) and ((right - left) / cols >= 4.0):
+        border = _surface.map_rgb(_pygameColor(borderColor))
+        image[np.flatnonzero(np.diff(colOf, prepend=-1)), :] = border
+        image[:, np.flatnonzero(np.diff(rowOf, prepend=-1))] = border
+    view = pygame.surfarray.pixels2d(_surface)
+    view[x0:x1, y0:y1] = image
+    del view
+
+
 def square(x, y, r):
     """
     Draw on the background canvas a square whose sides are of length
@@ -480,6 +686,65 @@ def filledPolygon(x, y):
     pygame.draw.polygon(_surface, _pygameColor(_penColor), points, 0)
 
 
+def _font(bold):
+    """
+    Return the pygame font for the current font family and size. Each
+    font is created only once.
+    """
+    return _loadFont(_fontFamily, _fontSize, bold)
+
+
+def _loadFont(family, size, bold):
+    """
+    Return the pygame font with the given family, size and boldness,
+    creating it (and initializing the font module) if needed.
+    """
+    key = (family, size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        with _fontLock:
+            font = _fonts.get(key)
+            if font is None:
+                if not pygame.font.get_init():
+                    pygame.font.init()
+                font = pygame.font.SysFont(family, size, bold)
+                _fonts[key] = font
+    return font
+
+
+def preloadFonts(fonts):
+    """
+    Start creating the fonts described by fonts, a sequence of
+    (family, size, bold) tuples, on a background thread, and return the
+    thread. Looking up the system fonts can be slow the first time, so
+    calling this early keeps the first text drawing from stalling.
+    """
+    fonts = list(fonts)
+
+    def _loadAll():
+        for family, size, bold in fonts:
+            _loadFont(family, size, bold)
+
+    thread = threading.Thread(target=_loadAll, daemon=True)
+    thread.start()
+    return thread
+
+
+def _renderText(s, bold):
+    """
+    Return the image of string s drawn with the current font and pen
+    color. Each image is rendered only once while it is in the cache.
+    """
+    key = (_fontFamily, _fontSize, bold, s, _penColor)
+    glyph = _glyphs.get(key)
+    if glyph is None:
+        if len(_glyphs) >= _MAX_GLYPHS:
+            _glyphs.clear()
+        glyph = _font(bold).render(s, 1, _pygameColor(_penColor))
+        _glyphs[key] = glyph
+    return glyph
+
+
 def text(x, y, s):
     """
     Draw string s on the background canvas centered at (x, y).
@@ -489,8 +754,7 @@ def text(x, y, s):
     y = float(y)
     xs = _scaleX(x)
     ys = _scaleY(y)
-    font = pygame.font.SysFont(_fontFamily, _fontSize)
-    text = font.render(s, 1, _pygameColor(_penColor))
+    text = _renderText(s, False)
     textpos = text.get_rect(center=(xs, ys))
     _surface.blit(text, textpos)
 
@@ -504,8 +768,7 @@ def boldText(x, y, s):
     y = float(y)
     xs = _scaleX(x)
     ys = _scaleY(y)
-    font = pygame.font.SysFont(_fontFamily, _fontSize, True)
-    text = font.render(s, 1, _pygameColor(_penColor))
+    text = _renderText(s, True)
     textpos = text.get_rect(center=(xs, ys))
     _surface.blit(text, textpos)
 
@@ -542,6 +805,39 @@ def clear(c=WHITE):
     _surface.fill(_pygameColor(c))
 
 
+def snapshot():
+    """
+    Return a copy of the background canvas. The copy can be drawn back
+    onto the background canvas by calling restore(), which is much
+    faster than drawing its contents again.
+    """
+    _makeSureWindowCreated()
+    return _surface.copy()
+
+
+def restore(s):
+    """
+    Draw s, a copy of the background canvas returned by snapshot(),
+    onto the background canvas.
+    """
+    _makeSureWindowCreated()
+    _surface.blit(s, (0, 0))
+
+
+def pixels():
+    """
+    Return the background canvas as a NumPy array of shape
+    (width, height, 3) that holds the red, green and blue values of
+    each pixel. The array shares memory with the canvas, so it is not
+    a copy and it changes when the canvas is drawn on. The canvas is
+    locked while the array exists; delete the array before calling
+    restore() or picture().
+    """
+    import pygame.surfarray
+    _makeSureWindowCreated()
+    return pygame.surfarray.pixels3d(_surface)
+
+
 def save(f):
     """
     Save the window canvas to file f.
@@ -567,11 +863,26 @@ def _show():
     """
     Copy the background canvas to the window canvas.
     """
-    _background.blit(_surface, (0, 0))
-    pygame.display.flip()
+    present()
     _checkForEvents()
 
 
+def present():
+    """
+    Copy the background canvas to the window canvas without checking
+    for events. Unlike show(), present() can be called by a thread
+    other than the one that checks for events, such as a render thread.
+    """
+    _makeSureWindowCreated()
+    # there is no window canvas when drawing offscreen
+    if _background is not None:
+        with _displayLock:
+            _background.blit(_surface, (0, 0))
+            pygame.display.flip()
+    for listener in _frameListeners:
+        listener(_surface)
+
+
 def _showAndWaitForever():
     """
     Copy the background canvas to the window canvas. Then wait
@@ -585,6 +896,24 @@ def _showAndWaitForever():
         _checkForEvents()
 
 
+def addFrameListener(f):
+    """
+    Call f each time the background canvas is shown, with the
+    pygame.Surface of the background canvas as its argument. f is called
+    by the thread that shows the canvas, so it must return quickly, and
+    it must not keep the surface, which is drawn on again afterwards.
+    """
+    _frameListeners.append(f)
+
+
+def removeFrameListener(f):
+    """
+    Stop calling f, which was given to addFrameListener(), each time
+    the background canvas is shown.
+    """
+    _frameListeners.remove(f)
+
+
 def show(msec=float('inf')):
     """
     Copy the background canvas to the window canvas, and
@@ -595,6 +924,15 @@ def show(msec=float('inf')):
 
     _makeSureWindowCreated()
     _show()
+    wait(msec)
+
+
+def wait(msec):
+    """
+    Wait for msec milliseconds without showing the background canvas,
+    checking for events (such as keys typed) in the meantime.
+    """
+    _makeSureWindowCreated()
     _checkForEvents()
 
     # Sleep for the required time, but check for events every
@@ -659,7 +997,19 @@ def _checkForEvents():
     Check if any new event has occured (such as a key typed or button
     pressed).  If a key has been typed, then put that key in a queue.
     """
-    global _surface
+    _makeSureWindowCreated()
+
+    with _displayLock:
+        events = pygame.event.get()
+    for event in events:
+        _handleEvent(event)
+
+
+def _handleEvent(event):
+    """
+    Handle the given event: remember a key typed or a mouse position,
+    save the drawing or quit.
+    """
     global _keysTyped
 
     # -------------------------------------------------------------------
@@ -671,29 +1021,73 @@ def _checkForEvents():
     # End added by Alan J. Broder
     # -------------------------------------------------------------------
 
+    if event.type == pygame.QUIT:
+        sys.exit()
+    elif event.type == pygame.KEYDOWN:
+        _keysTyped = [pygame.key.name(event.key)] + _keysTyped
+    elif (event.type == pygame.MOUSEBUTTONUP) and \
+            (event.button == 3):
+        _saveToFile()
+
+    # -------------------------------------------------------------------
+    # Begin added by Alan J. Broder
+    # -------------------------------------------------------------------
+    # Every time the mouse button is pressed, remember
+    # the mouse position as of that press.
+    elif (event.type == pygame.MOUSEBUTTONDOWN) and \
+            (event.button == 1):
+        _mousePressed = True
+        _mousePos = event.pos
+    # -------------------------------------------------------------------
+    # End added by Alan J. Broder
+    # -------------------------------------------------------------------
+
+
+def nextEvent(msec=None):
+    """
+    Wait until an event (such as a key typed or a mouse click) occurs,
+    or until msec milliseconds pass if msec is not None, without using
+    the CPU in the meantime, and return the event without handling it
+    (an event of type pygame.NOEVENT if no event occurred).  The display
+    lock is not held while waiting, so the window can be updated by
+    another thread in the meantime, and the wait can be made on a
+    worker thread while the thread running the program goes on; the
+    event is then handled with handleEvents.
+    """
     _makeSureWindowCreated()
 
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            sys.exit()
-        elif event.type == pygame.KEYDOWN:
-            _keysTyped = [pygame.key.name(event.key)] + _keysTyped
-        elif (event.type == pygame.MOUSEBUTTONUP) and \
-                (event.button == 3):
-            _saveToFile()
-
-        # ---------------------------------------------------------------
-        # Begin added by Alan J. Broder
-        # ---------------------------------------------------------------
-        # Every time the mouse button is pressed, remember
-        # the mouse position as of that press.
-        elif (event.type == pygame.MOUSEBUTTONDOWN) and \
-                (event.button == 1):
-            _mousePressed = True
-            _mousePos = event.pos
-            # ---------------------------------------------------------------
-        # End added by Alan J. Broder
-        # ---------------------------------------------------------------
+    if msec is None:
+        return pygame.event.wait()
+    if msec <= 0:
+        with _displayLock:
+            return pygame.event.poll()
+    return pygame.event.wait(max(1, int(msec)))
+
+
+def handleEvents(event):
+    """
+    Handle the given event (returned by nextEvent) and the events that
+    occurred after it.  Return True if an event occurred, and False if
+    the given event is of type pygame.NOEVENT.
+    """
+    if event.type == pygame.NOEVENT:
+        return False
+    with _displayLock:
+        events = [event] + pygame.event.get()
+    for event in events:
+        _handleEvent(event)
+    return True
+
+
+def waitForEvent(msec=None):
+    """
+    Wait until an event (such as a key typed or a mouse click) occurs,
+    or until msec milliseconds pass if msec is not None, without using
+    the CPU in the meantime, and handle the events.  Return True if an
+    event occurred, and False otherwise.  The window can be updated by
+    the other threads while this function waits (see nextEvent).
+    """
+    return handleEvents(nextEvent(msec))
 
 
 # -----------------------------------------------------------------------
@@ -783,7 +1177,6 @@ def mouseY():
 setXscale()
 setYscale()
 setPenRadius()
-pygame.font.init()
 
 
 # -----------------------------------------------------------------------
@@ -794,6 +1187,8 @@ def _getFileName():
     """
     Display a dialog box that asks the user for a file name.
     """
+    import tkinter as Tkinter
+    import tkinter.filedialog as tkFileDialog
     root = Tkinter.Tk()
     root.withdraw()
     reply = tkFileDialog.asksaveasfilename(initialdir='.')
@@ -806,6 +1201,8 @@ def _confirmFileSave():
     """
     Display a dialog box that confirms a file save operation.
     """
+    import tkinter as Tkinter
+    import tkinter.messagebox as tkMessageBox
     root = Tkinter.Tk()
     root.withdraw()
     tkMessageBox.showinfo(title='File Save Confirmation',
@@ -818,6 +1215,8 @@ def _reportFileSaveError(msg):
     Display a dialog box that reports a msg.  msg is a string which
     describes an error in a file save operation.
     """
+    import tkinter as Tkinter
+    import tkinter.messagebox as tkMessageBox
     root = Tkinter.Tk()
     root.withdraw()
     tkMessageBox.showerror(title='File Save Error', message=msg)
@@ -0,0 +1,41 @@
+import random
+
+from allocations import (TICK_PEAK_BYTES, create_falling_tetromino, net_allocation,
+                         peak_allocation)
+
+
+# A steady gravity tick allocates at most the iterator of a loop over the tiles
+# of the tetromino (TICK_PEAK_BYTES) while it runs
+def test_gravity_tick_peak_allocation():
+    grid, tetromino = create_falling_tetromino()
+    mean_peak, max_peak = peak_allocation(lambda: tetromino.move("down", grid), count=200)
+    assert max_peak <= TICK_PEAK_BYTES
+
+
+# A steady gravity tick keeps nothing allocated (a few bytes kept once by the
+# interpreter are allowed over the 200 ticks)
+def test_gravity_tick_net_allocation():
+    grid, tetromino = create_falling_tetromino()
+    ticks = 200
+    assert net_allocation(lambda: tetromino.move("down", grid), count=ticks) < ticks
+
+
+# A tetromino moved in every direction and rotated is back where it started,
+# as the points of its tiles are changed in place
+def test_moves_change_the_points_in_place():
+    # the seed puts the tetromino away from the sides of the grid
+    random.seed(1)
+    grid, tetromino = create_falling_tetromino(20, 12)
+    assert 0 < tetromino.bottom_left_corner.x < 12 - tetromino.n
+    for i in range(3):
+        tetromino.move("down", grid)
+    tiles = tetromino.tiles()
+    positions = [tile.get_position() for tile in tiles]
+    coordinates = [(position.x, position.y) for position in positions]
+    for direction in ("left", "right", "down"):
+        assert tetromino.move(direction, grid)
+    tetromino.rotateTetromino(1, grid, key=1)
+    tetromino.rotateTetromino(-1, grid, key=1)
+    assert [tile.get_position() for tile in tetromino.tiles()] == positions
+    assert [(position.x, position.y) for position in positions] == \
+        [(x, y - 1) for x, y in coordinates]
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from point import Point
+from tetromino import Tetromino
+from tile import Tile
+
+
+# Each test starts with empty pools, the pools are class attributes shared by
+# all the game grids of the process
+@pytest.fixture(autouse=True)
+def empty_pools(monkeypatch):
+    monkeypatch.setattr(Tile, "pool", [])
+    monkeypatch.setattr(Tetromino, "pool", {})
+
+
+# A released tile is given to the next tile created, at its new position and
+# with a new number
+def test_released_tile_is_used_again():
+    random.seed(0)
+    tile = Tile(Point(1, 2))
+    tile.number = 64
+    tile.updateTileColor()
+    tile.release()
+    position = Point(3, 4)
+    created = Tile.create(position)
+    assert created is tile
+    assert created.position is position
+    assert created.number in (2, 4)
+    assert not created.released
+    # the pool is empty again, so the next tile is a new one
+    assert Tile.create(Point(0, 0)) is not tile
+
+
+# A tile released twice is not put in the pool twice
+def test_tile_released_twice():
+    tile = Tile(Point(0, 0))
+    tile.release()
+    with pytest.raises(RuntimeError):
+        tile.release()
+    assert Tile.pool == [tile]
+
+
+# The tiles are drawn from the pool in the same order as new tiles, so a game
+# plays the same with or without the pool
+def test_pooled_tiles_draw_the_same_numbers():
+    random.seed(1)
+    new = [Tile(Point(0, 0)).number for i in range(20)]
+    Tile.pool.extend(Tile(Point(0, 0)) for i in range(20))
+    random.seed(1)
+    pooled = [Tile.create(Point(0, 0)).number for i in range(20)]
+    assert pooled == new
+
+
+# A released tetromino is given to the next tetromino of its type with new
+# tiles in its initial orientation
+def test_released_tetromino_is_used_again():
+    tetromino = Tetromino.create('T', 20, 12)
+    tiles = [tile for tile in tetromino.tile_matrix.flat if tile is not None]
+    tetromino.rotateTetromino(1, None, key=1)
+    tetromino.release()
+    created = Tetromino.create('T', 20, 12)
+    assert created is tetromino
+    assert not created.released
+    assert all(created.tile_matrix[row_index][col_index] is not None
+               for col_index, row_index in created.occupied_tiles)
+    # the tiles of the released tetromino are on the game grid, they are not
+    # used again by the tetromino
+    assert not any(tile in tiles for tile in created.tile_matrix.flat if tile is not None)
+    # a tetromino of another type or grid size is not taken from this pool
+    assert Tetromino.create('T', 40, 24) is not tetromino
+
+
+# A tetromino released twice is not put in the pool twice
+def test_tetromino_released_twice():
+    tetromino = Tetromino.create('I', 20, 12)
+    tetromino.release()
+    with pytest.raises(RuntimeError):
+        tetromino.release()
+    assert Tetromino.pool[('I', 20, 12)] == [tetromino]
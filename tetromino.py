@@ -1,14 +1,46 @@
 import random  # each tetromino is created with a random x value above the grid
-from color import Color
 import numpy as np  # fundamental Python module for scientific computing
 
 from point import Point  # used for tile positions
 from tile import Tile  # used for representing each tile on the tetromino
 
 
+# Shape of each type of tetromino in its initial orientation: n (the number of
+# rows = the number of columns of the tile matrix) and the (column_index,
+# row_index) of each occupied tile, the numbers of the tiles are drawn in this
+# order
+SHAPES = {
+    'I': (4, ((1, 0), (1, 1), (1, 2), (1, 3))),
+    'O': (2, ((0, 0), (1, 0), (0, 1), (1, 1))),
+    'Z': (3, ((0, 0), (1, 0), (1, 1), (2, 1))),
+    'L': (3, ((1, 0), (1, 1), (1, 2), (2, 2))),
+    'J': (3, ((1, 0), (1, 1), (1, 2), (0, 2))),
+    'S': (3, ((0, 1), (1, 1), (1, 0), (2, 0))),
+    'T': (3, ((0, 1), (1, 1), (1, 2), (2, 1))),
+}
+# types of the tetrominoes in the order they are drawn by Tetromino.random
+TYPES = ('I', 'O', 'Z', 'L', 'J', 'S', 'T')
+# change (dx, dy) of the positions for a move in each direction
+MOVES = {"left": (-1, 0), "right": (1, 0), "down": (0, -1)}
+
+
 # Class used for representing tetrominoes with 3 out of 7 different types/shapes
 # as (I, O and Z)
 class Tetromino:
+    # Class attributes shared among all Tetromino objects
+    # ---------------------------------------------------------------------------
+    # prototypes built once for each (type, grid_height, grid_width), each one
+    # is a tuple of n, the occupied tiles, the x of the bottom-left corner and
+    # the positions of the tiles when the tetromino is shown as the next
+    # tetromino (the points are never changed, so they are shared by all the
+    # tetrominoes of the prototype)
+    prototypes = {}
+    # tetrominoes released after they are placed on the game grid, for each
+    # (type, grid_height, grid_width), that are used again by create
+    pool = {}
+    # largest number of tetrominoes kept in the pool for each key
+    pool_size = 4
+
     # Constructor to create a tetromino with a given type (shape)
     def __init__(self, type, grid_height, grid_width):
         # set grid_height and grid_width from input parameters
@@ -17,82 +49,88 @@ class Tetromino:
         self.grid_width = grid_width
         self.full_grid_width = grid_width + grid_width / 3
         # set the shape of the tetromino based on the given type
-        occupied_tiles = []
-        if type == 'I':
-            n = 4  # n = number of rows = number of columns in the tile matrix
-            # shape of the tetromino I in its initial orientation
-            occupied_tiles.append((1, 0))  # (column_index, row_index)
-            occupied_tiles.append((1, 1))
-            occupied_tiles.append((1, 2))
-            occupied_tiles.append((1, 3))
-        elif type == 'O':
-            n = 2  # n = number of rows = number of columns in the tile matrix
-            # shape of the tetromino O in its initial orientation
-            occupied_tiles.append((0, 0))
-            occupied_tiles.append((1, 0))
-            occupied_tiles.append((0, 1))
-            occupied_tiles.append((1, 1))
-        elif type == 'Z':
-            n = 3  # n = number of rows = number of columns in the tile matrix
-            # shape of the tetromino Z in its initial orientation
-            occupied_tiles.append((0, 0))
-            occupied_tiles.append((1, 0))
-            occupied_tiles.append((1, 1))
-            occupied_tiles.append((2, 1))
-        elif type == 'L':
-            n = 3  # n = number of rows = number of columns in the tile matrix
-            # shape of the tetromino L in its initial orientation
-            occupied_tiles.append((1, 0))
-            occupied_tiles.append((1, 1))
-            occupied_tiles.append((1, 2))
-            occupied_tiles.append((2, 2))
-        elif type == 'J':
-            n = 3  # n = number of rows = number of columns in the tile matrix
-            # shape of the tetromino J in its initial orientation
-            occupied_tiles.append((1, 0))
-            occupied_tiles.append((1, 1))
-            occupied_tiles.append((1, 2))
-            occupied_tiles.append((0, 2))
-        elif type == 'S':
-            n = 3  # n = number of rows = number of columns in the tile matrix
-            # shape of the tetromino S in its initial orientation
-            occupied_tiles.append((0, 1))
-            occupied_tiles.append((1, 1))
-            occupied_tiles.append((1, 0))
-            occupied_tiles.append((2, 0))
-        elif type == 'T':
-            n = 3  # n = number of rows = number of columns in the tile matrix
-            # shape of the tetromino T in its initial orientation
-            occupied_tiles.append((0, 1))
-            occupied_tiles.append((1, 1))
-            occupied_tiles.append((1, 2))
-            occupied_tiles.append((2, 1))
+        n, occupied_tiles, corner_x, preview_positions = Tetromino.prototype(type, grid_height, grid_width)
         self.occupied_tiles = occupied_tiles
         self.n = n
         # create a matrix of numbered tiles based on the shape of the tetromino
         self.tile_matrix = np.full((n, n), None)
+        # tuples of the occupied tiles (see the tiles and side_tiles methods),
+        # built when they are first needed after the tile matrix changes
+        self.tile_lists = {}
+        self.bottom_left_corner = Point()
+        self.reset()
+
+    # Method for getting the prototype of the tetrominoes with the given type
+    # and dimensions of the game grid, it is built the first time it is needed
+    @staticmethod
+    def prototype(type, grid_height, grid_width):
+        key = (type, grid_height, grid_width)
+        prototype = Tetromino.prototypes.get(key)
+        if prototype is None:
+            n, occupied_tiles = SHAPES[type]
+            # constant horizontal position to show next tetromino, on the middle of
+            # the information grid (its width is grid_width / 3)
+            # if the type is O, increase x coordinate to center the tetromino
+            full_grid_width = grid_width + grid_width / 3
+            information_margin = max(0, (full_grid_width - grid_width - 4) / 2)
+            if type == 'O':
+                corner_x = grid_width + 1 + information_margin
+            else:
+                corner_x = grid_width + 0.5 + information_margin
+            # the bottom-left tile is on the row 1 of the information grid
+            preview_positions = tuple(Point(corner_x + col_index, 1 + (n - 1) - row_index)
+                                      for col_index, row_index in occupied_tiles)
+            prototype = (n, occupied_tiles, corner_x, preview_positions)
+            Tetromino.prototypes[key] = prototype
+        return prototype
+
+    # Method for creating a tetromino of the given type, a tetromino from the
+    # pool is used again if there is one (its tiles get new random numbers in
+    # the same order as the tiles of a new tetromino)
+    @staticmethod
+    def create(type, grid_height, grid_width):
+        pooled = Tetromino.pool.get((type, grid_height, grid_width))
+        if pooled:
+            tetromino = pooled.pop()
+            tetromino.reset()
+            return tetromino
+        return Tetromino(type, grid_height, grid_width)
+
+    # Method for creating a tetromino of a random type (shape) to enter the game
+    # grid, the type is drawn before the numbers of the tiles
+    @staticmethod
+    def random(grid_height, grid_width):
+        random_index = random.randint(0, len(TYPES) - 1)
+        return Tetromino.create(TYPES[random_index], grid_height, grid_width)
+
+    # Method for putting the tetromino in the pool after it is placed on the
+    # game grid; its tiles are now on the game grid, so they are not kept (a
+    # tetromino released twice would be given to two callers of create)
+    def release(self):
+        if self.released:
+            raise RuntimeError("the tetromino is already released")
+        self.released = True
+        self.tile_matrix.fill(None)
+        self.tile_lists.clear()
+        pooled = Tetromino.pool.setdefault((self.type, self.grid_height, self.grid_width), [])
+        if len(pooled) < Tetromino.pool_size:
+            pooled.append(self)
+
+    # Method for putting the tetromino in its initial orientation at the
+    # position where it is shown as the next tetromino, with new tiles
+    def reset(self):
+        n, occupied_tiles, corner_x, preview_positions = Tetromino.prototype(
+            self.type, self.grid_height, self.grid_width)
+        self.released = False
+        # the tile matrix may be rotated
+        self.tile_matrix.fill(None)
+        self.tile_lists.clear()
         # initial position of the bottom-left tile in the tile matrix just before
         # the tetromino enters the game grid
-        self.bottom_left_corner = Point()
-        # upper side of the game grid
-        self.bottom_left_corner.y = 1
-        # constant horizontal position to show next tetromino
-        # if the type is O, increase x coordinate to center the tetromino
-        if type == 'O':
-            self.bottom_left_corner.x = self.grid_width + 1
-        else:
-            self.bottom_left_corner.x = self.grid_width + 0.5
-        # create each tile by computing its position w.r.t. the game grid based on
-        # its bottom_left_corner
-        for i in range(len(self.occupied_tiles)):
-            col_index, row_index = self.occupied_tiles[i][0], self.occupied_tiles[i][1]
-            position = Point()
-            # horizontal position of the tile
-            position.x = self.bottom_left_corner.x + col_index
-            # vertical position of the tile
-            position.y = self.bottom_left_corner.y + (n - 1) - row_index
-            # create the tile on the computed position
-            self.tile_matrix[row_index][col_index] = Tile(position)
+        self.bottom_left_corner.move(corner_x, 1)
+        # create each tile on its position w.r.t. the game grid
+        for (col_index, row_index), position in zip(occupied_tiles, preview_positions):
+            self.tile_matrix[row_index][col_index] = Tile.create(position)
 
     # Method for the random position of the current tetromino
     def position(self):
@@ -117,16 +155,15 @@ class Tetromino:
 
     # Method for drawing the tetromino on the game grid
     def draw(self):
-        n = len(self.tile_matrix)  # n = number of rows = number of columns
-        for row in range(n):
-            for col in range(n):
-                # draw each occupied tile (not equal to None) on the game grid
-                if self.tile_matrix[row][col] is not None:
-                    # considering newly entered tetrominoes to the game grid that may
-                    # have tiles with position.y >= grid_height
-                    position = self.tile_matrix[row][col].get_position()
-                    if position.y < self.grid_height:
-                        self.tile_matrix[row][col].draw()
+        Tile.draw_states(self.tile_states())
+
+    # Method for getting the states (see Tile.state) of the tiles to draw
+    def tile_states(self):
+        # each occupied tile (not equal to None) is drawn on the game grid
+        # considering newly entered tetrominoes to the game grid that may
+        # have tiles with position.y >= grid_height
+        return tuple(tile.state() for tile in self.tile_matrix.flat
+                     if tile is not None and tile.get_position().y < self.grid_height)
 
     # method for rotation
     def rotateTetromino(self, rotDir, grid, key=0):
@@ -154,7 +191,6 @@ class Tetromino:
     # a specific method for o piece rotation that only rotates numbers and colors around the piece and not tile objects
     def rotate_O_piece(self, rotDir):
         n = len(self.tile_matrix)
-        colors = {2: Color(238, 228, 218), 4: Color(236, 223, 190)}  # dictionary for tile colors
         numbers = []  # array for storing number values
         newArr = np.full((n, n), None)  # array for storing rotated numbers
         # nested loop for collecting numbers from tile matrix
@@ -176,10 +212,7 @@ class Tetromino:
         for r in range(n):
             for c in range(n):
                 self.tile_matrix[r][c].number = newArr[r][c]
-                if newArr[r][c] == 2:
-                    self.tile_matrix[r][c].background_color = colors[2]
-                else:
-                    self.tile_matrix[r][c].background_color = colors[4]
+                self.tile_matrix[r][c].updateTileColor()
         return True
 
     def drop(self, grid):  # a simple method for dropping the piece instantly
@@ -232,84 +265,99 @@ class Tetromino:
                 for r in range(R - 1, -1, -1):
                     newArr[c][R - r - 1] = self.tile_matrix[r][c]
         self.tile_matrix = newArr
+        self.tile_lists.clear()
+
+    # Method for getting the occupied tiles of the tetromino as a tuple, in the
+    # order of the rows and the columns of the tile matrix
+    def tiles(self):
+        tiles = self.tile_lists.get("all")
+        if tiles is None:
+            tiles = tuple(tile for tile in self.tile_matrix.flat if tile is not None)
+            self.tile_lists["all"] = tiles
+        return tiles
 
-    # Method for moving the tetromino in a given direction by 1 on the game grid
+    # Method for getting the tiles on the side of the tetromino in the given
+    # direction as a tuple: the bottommost tile of each column for down, and
+    # the leftmost (rightmost) tile of each row for left (right)
+    def side_tiles(self, direction):
+        tiles = self.tile_lists.get(direction)
+        if tiles is None:
+            n = len(self.tile_matrix)  # n = number of rows = number of columns
+            if direction == "down":
+                lines = [self.tile_matrix[::-1, col] for col in range(n)]
+            elif direction == "left":
+                lines = [self.tile_matrix[row] for row in range(n)]
+            else:  # direction == "right"
+                lines = [self.tile_matrix[row, ::-1] for row in range(n)]
+            side = []
+            for line in lines:
+                for tile in line:
+                    if tile is not None:
+                        side.append(tile)
+                        break
+            tiles = tuple(side)
+            self.tile_lists[direction] = tiles
+        return tiles
+
+    # Method for moving the tetromino in a given direction by 1 on the game grid,
+    # a move allocates nothing: the tiles are kept in tuples and their points
+    # are changed in place
     def move(self, direction, game_grid):
         # check if the tetromino can be moved in the given direction by using the
         # can_be_moved method defined below
         if not (self.can_be_moved(direction, game_grid)):
             return False  # tetromino cannot be moved in the given direction
+        dx, dy = MOVES[direction]
         # move the tetromino by first updating the position of the bottom left tile
-        if direction == "left":
-            self.bottom_left_corner.x -= 1
-        elif direction == "right":
-            self.bottom_left_corner.x += 1
-        else:  # direction == "down"
-            self.bottom_left_corner.y -= 1
+        self.bottom_left_corner.translate(dx, dy)
         # then moving each occupied tile in the given direction by 1
-        n = len(self.tile_matrix)  # n = number of rows = number of columns
-        for row in range(n):
-            for col in range(n):
-                if self.tile_matrix[row][col] is not None:
-                    if direction == "left":
-                        self.tile_matrix[row][col].move(-1, 0)
-                    elif direction == "right":
-                        self.tile_matrix[row][col].move(1, 0)
-                    else:  # direction == "down"
-                        self.tile_matrix[row][col].move(0, -1)
+        for tile in self.tiles():
+            tile.move(dx, dy)
         return True  # successful move in the given direction
 
     # Method to check if the tetromino can be moved in the given direction or not
     def can_be_moved(self, dir, game_grid):
-        n = len(self.tile_matrix)  # n = number of rows = number of columns
-        if dir == "left" or dir == "right":
-            for row in range(n):
-                for col in range(n):
-                    # direction = left --> check the leftmost tile of each row
-                    if dir == "left" and self.tile_matrix[row][col] is not None:
-                        leftmost = self.tile_matrix[row][col].get_position()
-                        # tetromino cannot go left if any leftmost tile is at x = 0
-                        if leftmost.x == 0:
-                            return False
-                        # skip each row whose leftmost tile is out of the game grid
-                        # (possible for newly entered tetrominoes to the game grid)
-                        if leftmost.y >= self.grid_height:
-                            break
-                        # tetromino cannot go left if the grid cell on the left of any leftmost tiles is occupied
-                        if game_grid.is_occupied(leftmost.y, leftmost.x - 1):
-                            return False
-                        break  # end the inner for loop
-                    # direction = right --> check the rightmost tile of each row
-                    elif dir == "right" and self.tile_matrix[row][n - 1 - col] is not None:
-                        rightmost = self.tile_matrix[row][n - 1 - col].get_position()
-                        # tetromino cannot go right if any of its rightmost tiles is
-                        # at x = grid_width - 1
-                        if rightmost.x == self.grid_width - 1:
-                            return False
-                        # skip each row whose rightmost tile is out of the game grid
-                        # (possible for newly entered tetrominoes to the game grid)
-                        if rightmost.y >= self.grid_height:
-                            break
-                        # tetromino cannot go right if the grid cell on the right of its rightmost tiles is occupied
-                        if game_grid.is_occupied(rightmost.y, rightmost.x + 1):
-                            return False
-                        break  # end the inner for loop
-        # direction = down --> check the bottommost tile of each column
-
+        if dir == "left":
+            # direction = left --> check the leftmost tile of each row
+            for tile in self.side_tiles(dir):
+                leftmost = tile.get_position()
+                # tetromino cannot go left if any leftmost tile is at x = 0
+                if leftmost.x == 0:
+                    return False
+                # skip each row whose leftmost tile is out of the game grid
+                # (possible for newly entered tetrominoes to the game grid)
+                if leftmost.y >= self.grid_height:
+                    continue
+                # tetromino cannot go left if the grid cell on the left of any leftmost tiles is occupied
+                if game_grid.is_occupied(leftmost.y, leftmost.x - 1):
+                    return False
+        elif dir == "right":
+            # direction = right --> check the rightmost tile of each row
+            for tile in self.side_tiles(dir):
+                rightmost = tile.get_position()
+                # tetromino cannot go right if any of its rightmost tiles is
+                # at x = grid_width - 1
+                if rightmost.x == self.grid_width - 1:
+                    return False
+                # skip each row whose rightmost tile is out of the game grid
+                # (possible for newly entered tetrominoes to the game grid)
+                if rightmost.y >= self.grid_height:
+                    continue
+                # tetromino cannot go right if the grid cell on the right of its rightmost tiles is occupied
+                if game_grid.is_occupied(rightmost.y, rightmost.x + 1):
+                    return False
         else:
-            for col in range(n):
-                for row in range(n - 1, -1, -1):
-                    if self.tile_matrix[row][col] is not None:
-                        bottommost = self.tile_matrix[row][col].get_position()
-                        # skip each column whose bottommost tile is out of the grid
-                        # (possible for newly entered tetrominoes to the game grid)
-                        if bottommost.y > self.grid_height:
-                            break
-                        # tetromino cannot go down if any bottommost tile is at y = 0
-                        if bottommost.y == 0:
-                            return False
-                            # or the grid cell below any bottommost tile is occupied
-                        if game_grid.is_occupied(bottommost.y - 1, bottommost.x):
-                            return False
-                        break  # end the inner for loop
+            # direction = down --> check the bottommost tile of each column
+            for tile in self.side_tiles(dir):
+                bottommost = tile.get_position()
+                # skip each column whose bottommost tile is out of the grid
+                # (possible for newly entered tetrominoes to the game grid)
+                if bottommost.y > self.grid_height:
+                    continue
+                # tetromino cannot go down if any bottommost tile is at y = 0
+                if bottommost.y == 0:
+                    return False
+                # or the grid cell below any bottommost tile is occupied
+                if game_grid.is_occupied(bottommost.y - 1, bottommost.x):
+                    return False
         return True  # tetromino can be moved in the given direction
@@ -1,12 +1,37 @@
-import copy as cp  # the copy module is used for copying tile positions
 import random
 
-import numpy as np
-
 import stddraw  # the stddraw module is used as a basic graphics library
 from color import Color  # used for coloring the tile and the number on it
 from point import Point  # used for representing the position of the tile
 
+# Colors shared by all the tiles, a tile never creates a color of its own
+# background colors indexed by the exponent of the tile number, that is
+# BACKGROUND_COLORS[k] is used for the number 2 ** k and the last color is
+# used for all the numbers above 2048
+BACKGROUND_COLORS = (
+    Color(62, 57, 51),  # not used (1 is never on a tile)
+    Color(238, 228, 218),  # 2
+    Color(236, 223, 190),  # 4
+    Color(242, 177, 121),  # 8
+    Color(246, 149, 98),  # 16
+    Color(246, 124, 94),  # 32
+    Color(255, 88, 68),  # 64
+    Color(243, 209, 89),  # 128
+    Color(236, 203, 106),  # 256
+    Color(238, 200, 82),  # 512
+    Color(233, 200, 60),  # 1024
+    Color(240, 196, 36),  # 2048
+    Color(62, 57, 51),  # 4096 and above
+)
+# number colors for small (2 and 4) and large (8 and above) numbers
+DARK_NUMBER_COLOR = Color(64, 64, 64)
+LIGHT_NUMBER_COLOR = Color(255, 255, 255)
+# boundary (box) color
+BOUNDARY_COLOR = Color(128, 128, 128)
+# colors of the tiles that are being merged or cleared
+HIGHLIGHT_BACKGROUND_COLOR = Color(0, 255, 0)
+HIGHLIGHT_NUMBER_COLOR = Color(255, 255, 255)
+
 
 # Class used for representing numbered tiles as in 2048
 class Tile:
@@ -14,11 +39,54 @@ class Tile:
     # ---------------------------------------------------------------------------
     # value used for the thickness of the boxes (boundaries) around the tiles
     boundary_thickness = 0.003
-    # font family and size used for displaying the tile number
+    # font family and size used for displaying the tile number, the size is
+    # changed by set_cell_size (14 is the size for 40 pixel cells)
     font_family, font_size = "Arial", 14
+    # smallest font size for drawing the numbers, the numbers are not drawn on
+    # cells that are too small for reading them
+    min_font_size = 6
+    # size of the cells (in pixels) set by set_cell_size and the smallest cell
+    # size for drawing the boxes, the box (about 2 pixels wide) would cover a
+    # smaller cell with the boundary color
+    cell_size = 40
+    min_boundary_cell_size = 10
+    # tiles removed from the game grid (merged or cleared) that are used again
+    # by create instead of creating new tiles
+    pool = []
+    # largest number of tiles kept in the pool
+    pool_size = 256
+    # instance attributes are stored in fixed slots instead of a dictionary
+    __slots__ = ('number', 'background_color', 'foreground_color', 'boundary_color', 'position',
+                 'released')
 
     # Constructor that creates a tile at a given position with 2 as its number
-    def __init__(self, position=Point(0, 0)):  # (0, 0) is the default position
+    def __init__(self, position=None):  # (0, 0) is the default position
+        # the default point is created for the tile, as the tile may change it
+        self.reset(Point(0, 0) if position is None else position)
+
+    # Method for creating a tile at the given position, a tile from the pool is
+    # used again if there is one (its number is drawn as for a new tile)
+    @staticmethod
+    def create(position):
+        if Tile.pool:
+            tile = Tile.pool.pop()
+            tile.reset(position)
+            return tile
+        return Tile(position)
+
+    # Method for putting the tile in the pool after it is removed from the game
+    # grid, the tile must not be used after it is released (a tile released
+    # twice would be given to two callers of create)
+    def release(self):
+        if self.released:
+            raise RuntimeError("the tile is already released")
+        self.released = True
+        if len(Tile.pool) < Tile.pool_size:
+            Tile.pool.append(self)
+
+    # Method for giving the tile a new random number (2 or 4) and its colors at
+    # the given position
+    def reset(self, position):
         # assign the number on the tile
         temp = random.randint(0, 1)
         if temp == 0:
@@ -26,80 +94,67 @@ class Tile:
         else:
             self.number = 4
         # set the colors of the tile
-        if self.number == 2:
-            self.background_color = Color(238, 228, 218)
-        else:
-            self.background_color = Color(236, 223, 190)
-
-        self.foreground_color = Color(64, 64, 64)  # foreground (number) color
-        self.boundary_color = Color(128, 128, 128)  # boundary (box) color
-        # set the position of the tile as the given position
-        self.position = Point(position.x, position.y)
+        self.background_color = BACKGROUND_COLORS[self.number.bit_length() - 1]
+        self.foreground_color = DARK_NUMBER_COLOR  # foreground (number) color
+        self.boundary_color = BOUNDARY_COLOR  # boundary (box) color
+        self.released = False
+        # set the position of the tile as the given position (the point is not
+        # copied, see set_position)
+        self.position = position
 
     # method for updating tile colors after each merge
     def updateTileColor(self):
         # check for numbers color
         if self.number >= 8:
-            self.foreground_color = Color(255, 255, 255)
-        else:
-            self.foreground_color = Color(64, 64, 64)
-        # check for tile background colors
-        if self.number == 2:
-            self.background_color = Color(238, 228, 218)
-        elif self.number == 4:
-            self.background_color = Color(236, 223, 190)
-        elif self.number == 8:
-            self.background_color = Color(242, 177, 121)
-        elif self.number == 16:
-            self.background_color = Color(246, 149, 98)
-        elif self.number == 32:
-            self.background_color = Color(246, 124, 94)
-        elif self.number == 64:
-            self.background_color = Color(255, 88, 68)
-        elif self.number == 128:
-            self.background_color = Color(243, 209, 89)
-        elif self.number == 256:
-            self.background_color = Color(236, 203, 106)
-        elif self.number == 512:
-            self.background_color = Color(238, 200, 82)
-        elif self.number == 1024:
-            self.background_color = Color(233, 200, 60)
-        elif self.number == 2048:
-            self.background_color = Color(240, 196, 36)
+            self.foreground_color = LIGHT_NUMBER_COLOR
         else:
-            self.background_color = Color(62, 57, 51)
+            self.foreground_color = DARK_NUMBER_COLOR
+        # the exponent of the number selects the background color
+        exponent = self.number.bit_length() - 1
+        self.background_color = BACKGROUND_COLORS[min(exponent, len(BACKGROUND_COLORS) - 1)]
+
+    # method for marking the tile while it is being merged or cleared
+    def highlight(self):
+        self.background_color = HIGHLIGHT_BACKGROUND_COLOR
+        self.foreground_color = HIGHLIGHT_NUMBER_COLOR
 
     # Setter method for the position of the tile
     def set_position(self, position):
-        # set the position of the tile as the given position
-        self.position = cp.copy(position)
+        # set the position of the tile as the given position, the point is not
+        # copied and the tile changes it when it is moved or rotated, so it must
+        # not be used as the position of anything else
+        self.position = position
 
     # Getter method for the position of the tile
     def get_position(self):
-        # return the position of the tile
-        return cp.copy(self.position)
+        # return the position of the tile, the returned point must not be changed
+        # and it changes when the tile is moved or rotated
+        return self.position
 
     # Rotate method for tiles
     def rotateTile(self, centerCoord, rotDir):  # 1 for right -1 for left
-        relativeCoord = []
-        # rotation arrays
-        clockwiseArr = np.array([[0, 1], [-1, 0]])
-        counterClockwiseArrr = np.array([[0, -1], [1, 0]])
-        relativeCoord.append(self.position.x - centerCoord.x)
-        relativeCoord.append(self.position.y - centerCoord.y)
+        # coordinates relative to the rotation center
+        relative_x = self.position.x - centerCoord.x
+        relative_y = self.position.y - centerCoord.y
+        # the point of the tile is changed in place (see set_position)
         if rotDir == 1:
-            # dot product is the new relative coordinates array
-            newCoord = np.dot(clockwiseArr, relativeCoord)
-            # to get from relative coordinates to new coordinates, coordinates of the axis are added
-            self.position.x = newCoord[0] + centerCoord.x
-            self.position.y = newCoord[1] + centerCoord.y
+            # clockwise rotation matrix [[0, 1], [-1, 0]] applied to the relative
+            # coordinates, then the coordinates of the center are added back
+            self.position.move(relative_y + centerCoord.x, -relative_x + centerCoord.y)
         else:
-            newCoord = np.dot(counterClockwiseArrr, relativeCoord)
-            self.position.x = newCoord[0] + centerCoord.x
-            self.position.y = newCoord[1] + centerCoord.y
+            # counterclockwise rotation matrix [[0, -1], [1, 0]]
+            self.position.move(-relative_y + centerCoord.x, relative_x + centerCoord.y)
+
+    # Method for scaling the font of the tile numbers for cells of the given
+    # size (in pixels)
+    @staticmethod
+    def set_cell_size(cell_size):
+        Tile.cell_size = cell_size
+        Tile.font_size = max(1, round(14 * cell_size / 40))
 
     # Method for moving the tile by dx along the x-axis and by dy along the y-axis
     def move(self, dx, dy):
+        # the point of the tile is changed in place (see set_position)
         self.position.translate(dx, dy)
 
     # Method for drawing the tile
@@ -108,12 +163,49 @@ class Tile:
         stddraw.setPenColor(self.background_color)
         stddraw.filledSquare(self.position.x, self.position.y, 0.5)
         # draw the bounding box of the tile as a square
-        stddraw.setPenColor(self.boundary_color)
-        stddraw.setPenRadius(Tile.boundary_thickness)
-        stddraw.square(self.position.x, self.position.y, 0.5)
-        stddraw.setPenRadius()  # reset the pen radius to its default value
+        if Tile.cell_size >= Tile.min_boundary_cell_size:
+            stddraw.setPenColor(self.boundary_color)
+            stddraw.setPenRadius(Tile.boundary_thickness)
+            stddraw.square(self.position.x, self.position.y, 0.5)
+            stddraw.setPenRadius()  # reset the pen radius to its default value
         # draw the number on the tile
         stddraw.setPenColor(self.foreground_color)
         stddraw.setFontFamily(Tile.font_family)
         stddraw.setFontSize(Tile.font_size)
         stddraw.boldText(self.position.x, self.position.y, str(self.number))
+
+    # Method for getting the values needed for drawing the tile as a tuple,
+    # the tuple does not change when the tile changes later
+    def state(self):
+        return (self.position.x, self.position.y, self.number,
+                self.background_color, self.foreground_color, self.boundary_color)
+
+    # Method for drawing many tiles with a few batched drawing calls
+    @staticmethod
+    def draw_tiles(tiles):
+        Tile.draw_states([tile.state() for tile in tiles])
+
+    # Method for drawing tiles given by their states (see the state method)
+    # with a few batched drawing calls
+    @staticmethod
+    def draw_states(states):
+        if len(states) == 0:
+            return
+        # lower left corners of the tiles
+        xs = [state[0] - 0.5 for state in states]
+        ys = [state[1] - 0.5 for state in states]
+        # draw the tiles as filled squares grouped by their colors
+        stddraw.filledRectangles(xs, ys, 1.0, 1.0, [state[3] for state in states])
+        # draw the bounding boxes of the tiles as squares
+        if Tile.cell_size >= Tile.min_boundary_cell_size:
+            stddraw.setPenRadius(Tile.boundary_thickness)
+            stddraw.rectangles(xs, ys, 1.0, 1.0, [state[5] for state in states])
+            stddraw.setPenRadius()  # reset the pen radius to its default value
+        if Tile.font_size < Tile.min_font_size:
+            return
+        # draw the numbers on the tiles
+        stddraw.setFontFamily(Tile.font_family)
+        stddraw.setFontSize(Tile.font_size)
+        for x, y, number, background_color, foreground_color, boundary_color in states:
+            stddraw.setPenColor(foreground_color)
+            stddraw.boldText(x, y, str(number))